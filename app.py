@@ -1,9 +1,23 @@
 # app.py
 import os
 import time
+import threading
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import requests
 import pandas as pd
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+import arbs
+import book_coverage
+import keypool
+import odds_cache
+import odds_client
+import replay
+import resilience
+import scheduler
+import snapshots
 
 # ──────────────────────────────────────────────────────────────────────────────
 # 1) Config de página (debe ser el primer st.* y solo una vez)
@@ -13,234 +27,501 @@ st.set_page_config(page_title="Arbitrage Finder — The Odds API", layout="wide"
 # ──────────────────────────────────────────────────────────────────────────────
 # 2) Carga robusta de API key
 # ──────────────────────────────────────────────────────────────────────────────
-def load_api_key():
-    try:
-        key = st.secrets.get("THE_ODDS_API_KEY")
-        if key:
-            return key
-    except Exception:
-        pass
-    key = os.getenv("THE_ODDS_API_KEY")
-    if key:
-        return key
+def load_api_keys():
+    # Varias keys (THE_ODDS_API_KEYS) multiplican la cuota; THE_ODDS_API_KEY sigue valiendo
     try:
-        import tomllib  # Python 3.11+
-        with open(".streamlit/secrets.toml", "rb") as f:
-            data = tomllib.load(f)
-            return data.get("THE_ODDS_API_KEY")
+        keys = odds_client.split_keys(st.secrets.get("THE_ODDS_API_KEYS")) + \
+            odds_client.split_keys(st.secrets.get("THE_ODDS_API_KEY"))
+        if keys:
+            return list(dict.fromkeys(keys))
     except Exception:
         pass
-    return None
+    return odds_client.load_api_keys()
 
-API_KEY = load_api_key()
-BASE_URL = "https://api.the-odds-api.com/v4"
+# Rotador compartido: recuerda la cuota que le queda a cada key entre reruns y sesiones
+@st.cache_resource(show_spinner=False)
+def get_key_pool(keys):
+    return keypool.KeyPool(keys)
+
+API_KEYS = load_api_keys()
+BASE_URL = odds_client.BASE_URL
 
 # Diagnóstico útil
 st.caption(f"📁 CWD: {os.getcwd()}")
 st.caption(f"🔎 Existe .streamlit/secrets.toml? {os.path.exists('.streamlit/secrets.toml')}")
-st.caption(f"🔐 API key cargada? {'sí' if bool(API_KEY) else 'no'}")
+st.caption(f"🔐 API keys cargadas: {len(API_KEYS) or 'ninguna'}")
+
+if replay.REPLAY_DIR:
+    st.caption(f"▶️ Reproduciendo grabaciones de {replay.REPLAY_DIR} a velocidad x{replay.REPLAY_SPEED:g} (sin red)")
+    API_KEYS = API_KEYS or ["replay"]
+elif replay.RECORD_DIR:
+    st.caption(f"⏺️ Grabando respuestas crudas en {replay.RECORD_DIR}")
 
-if not API_KEY:
+if not API_KEYS:
     st.error("Falta THE_ODDS_API_KEY. En Cloud: Settings→Secrets. En local: .streamlit/secrets.toml o variable de entorno.")
     st.stop()
 
+API_KEY = get_key_pool(tuple(API_KEYS))
+
 # ──────────────────────────────────────────────────────────────────────────────
 # 3) Sidebar: configuración + selector de deporte con buscador
 # ──────────────────────────────────────────────────────────────────────────────
 st.sidebar.title("⚙️ Configuración")
 
+data_source = st.sidebar.radio(
+    "Origen de datos", ["API (directo)", "Poller (snapshot)"],
+    help="Con el poller (python poller.py) la UI solo lee el último snapshot publicado y no espera a la red."
+)
+use_snapshot = data_source.startswith("Poller")
+
+allowed_books = st.sidebar.multiselect(
+    "Casas en las que apuesto",
+    options=book_coverage.all_bookmakers(),
+    default=[],
+    help="Si eliges casas, se calcula la forma más barata de traerlas (regiones mínimas o parámetro bookmakers=) y solo se buscan arbitrajes entre ellas. Con el poller, se eligen al arrancarlo (--bookmakers).",
+    disabled=use_snapshot,
+)
+if use_snapshot:
+    allowed_books = []  # el snapshot ya viene con las casas y el coste del poller
+
 regions = st.sidebar.multiselect(
     "Regiones (bookmakers)",
     options=["uk", "eu", "us", "au"],
     default=["uk", "eu"],
-    help="Filtra casas por región (afecta qué casas devuelve la API)."
+    help="Filtra casas por región (afecta qué casas devuelve la API).",
+    disabled=bool(allowed_books),
 )
 
+markets = st.sidebar.multiselect(
+    "Mercados",
+    options=["h2h", "spreads", "totals"],
+    default=["h2h"],
+    help="Se piden todos en una sola llamada. Cada mercado multiplica el coste: regiones × mercados créditos."
+) or ["h2h"]
+# Plan de cobertura: qué se pide realmente a /odds y cuánto cuesta, antes de llamar
+fetch_bookmakers = None
+if use_snapshot:
+    st.sidebar.caption("Casas, regiones y coste por llamada los decide el poller (`--bookmakers`, `--regions`, `--markets`).")
+elif allowed_books:
+    coverage_plan = book_coverage.optimize(allowed_books, markets)
+    if coverage_plan["mode"] == "regions":
+        regions = coverage_plan["regions"]
+        plan_desc = f"regions={','.join(regions)}"
+    else:
+        fetch_bookmakers = coverage_plan["bookmakers"]
+        plan_desc = f"bookmakers= ({len(fetch_bookmakers)} casas)"
+    alt = "; ".join(f"{o['mode']}: {o['cost']}" for o in coverage_plan["alternatives"])
+    st.sidebar.caption(f"Coste por llamada a /odds: {coverage_plan['cost']} créditos con {plan_desc}"
+                       + (f" (alternativa {alt})" if alt else ""))
+else:
+    st.sidebar.caption(f"Coste por llamada a /odds: {max(len(regions), 1)} regiones × {len(markets)} mercados = {max(len(regions), 1) * len(markets)} créditos")
+
 min_edge = st.sidebar.slider("Margen mínimo de arbitraje (%)", 0.1, 10.0, 1.0, 0.1)
 bankroll = st.sidebar.number_input("Bankroll para cálculo de stakes (€)", min_value=10.0, value=100.0, step=10.0)
-require_diff_books = st.sidebar.checkbox("Exigir casas distintas para cada lado", value=True)
-ttl_seconds = st.sidebar.slider("Cache TTL (segundos)", 10, 600, 60, 10)
-only_two_outcome_sports = st.sidebar.checkbox("Mostrar solo deportes H2H de 2 resultados", value=True, help="Recomendado para esta versión de arbitraje.")
+require_diff_books = st.sidebar.checkbox("Exigir casas distintas para cada resultado", value=True)
+ttl_seconds = st.sidebar.slider("Cache TTL (segundos)", 10, 600, 60, 10, help="Intervalo mínimo de refresco, el de los partidos a punto de empezar o en juego. Los partidos lejanos se refrescan menos, y el planificador de cuota puede alargarlo por deporte para que la cuota llegue al reinicio.")
+max_stale = st.sidebar.slider("Servir datos caducados hasta (segundos)", 0, 1800, 300, 30, help="Stale-while-revalidate: si las cuotas caducaron hace menos de esto se muestran ya y se refrescan en segundo plano. 0 = esperar siempre a la descarga.")
+window_hours = st.sidebar.slider("Ventana de partidos (horas)", 0, 168, 0, 6, help="Solo partidos que empiezan en las próximas N horas (0 = sin límite). Antes de pedir cuotas se consulta /events, que es gratis, y se saltan los deportes sin partidos en la ventana.")
+quota_reset = st.sidebar.date_input("Reinicio de la cuota mensual", value=scheduler.next_month_reset().date())
+
+scan_all = st.sidebar.checkbox("Escanear todos los deportes filtrados", value=False, help="Descarga en paralelo todos los deportes del filtro y une los arbitrajes en una sola tabla.")
+scan_workers = st.sidebar.slider("Descargas en paralelo", 0, 32, 0, 1, disabled=not scan_all,
+                                 help="0 = una por deporte (hasta el tamaño del pool de conexiones): el barrido tarda lo que la descarga más lenta.")
 
 sport_search = st.sidebar.text_input("Buscar deporte/torneo", value="", help="Filtra por texto en título o clave (ej. 'tennis', 'nba', 'mlb', 'wta').")
 
 # ──────────────────────────────────────────────────────────────────────────────
 # 4) Fetch helpers
 # ──────────────────────────────────────────────────────────────────────────────
-@st.cache_data(show_spinner=False)
-def fetch_sports(api_key, cache_buster):
-    r = requests.get(f"{BASE_URL}/sports", params={"apiKey": api_key}, timeout=30)
-    r.raise_for_status()
-    return r.json()
-
-@st.cache_data(show_spinner=False)
-def fetch_odds(sport_key, regions, api_key, cache_buster):
-    params = {
-        "regions": ",".join(regions) if regions else "uk,eu",
-        "markets": "h2h",
-        "oddsFormat": "decimal",
-        "apiKey": api_key
-    }
-    url = f"{BASE_URL}/sports/{sport_key}/odds"
-    r = requests.get(url, params=params, timeout=30)
-    headers = {
-        "x-requests-remaining": r.headers.get("x-requests-remaining"),
-        "x-requests-used": r.headers.get("x-requests-used"),
-        "x-requests-last": r.headers.get("x-requests-last"),
-    }
-    r.raise_for_status()
-    return r.json(), headers
-
-def best_two_outcome_arbs(event_bookmakers, require_diff_books=True):
-    rows = []
-    for bk in event_bookmakers:
-        name = bk.get("title") or bk.get("key")
-        for m in bk.get("markets", []):
-            if m.get("key") != "h2h":
-                continue
-            outs = m.get("outcomes", [])
-            if len(outs) != 2:
-                continue  # ignoramos mercados con 3 resultados (ej. fútbol 1X2)
-            o1, o2 = outs[0], outs[1]
-            rows.append({
-                "bookmaker": name,
-                "outcome1_name": o1.get("name"),
-                "outcome1_price": float(o1.get("price")) if o1.get("price") is not None else None,
-                "outcome2_name": o2.get("name"),
-                "outcome2_price": float(o2.get("price")) if o2.get("price") is not None else None,
-            })
-
-    arbs = []
-    for i in range(len(rows)):
-        for j in range(len(rows)):
-            if i == j and require_diff_books:
-                continue
-            a, b = rows[i], rows[j]
-            if not a["outcome1_price"] or not b["outcome2_price"]:
-                continue
-            inv_sum = (1.0 / a["outcome1_price"]) + (1.0 / b["outcome2_price"])
-            if inv_sum < 1.0:
-                edge = 1.0 - inv_sum
-                arbs.append({
-                    "bk_outcome1": a["bookmaker"],
-                    "bk_outcome2": b["bookmaker"],
-                    "outcome1": a["outcome1_name"],
-                    "odd1": a["outcome1_price"],
-                    "outcome2": b["outcome2_name"],
-                    "odd2": b["outcome2_price"],
-                    "edge": edge
-                })
-    arbs.sort(key=lambda d: d["edge"], reverse=True)
-    return arbs
-
-def stake_split(odd1, odd2, bankroll):
-    inv1, inv2 = 1.0/odd1, 1.0/odd2
-    denom = inv1 + inv2
-    s1 = bankroll * (inv1 / denom)
-    s2 = bankroll * (inv2 / denom)
-    edge = 1.0 - denom
-    profit = bankroll * edge
-    return s1, s2, edge, profit
+# Una única sesión HTTP (pool keep-alive) compartida por todas las sesiones y reruns
+@st.cache_resource(show_spinner=False)
+def get_http_session():
+    return odds_client.build_session()
+
+# Planificador de cuota compartido: aprende coste y rendimiento de cada deporte
+@st.cache_resource(show_spinner=False)
+def get_scheduler():
+    return scheduler.QuotaScheduler()
+
+# Caché TTL + LRU acotada, compartida por todas las sesiones y respaldada en disco
+# (SQLite WAL) para que otros procesos y los reinicios no gasten cuota de nuevo
+OFFLINE_ERRORS = (requests.ConnectionError, requests.Timeout)
+
+@st.cache_resource(show_spinner=False)
+def get_odds_cache():
+    # Al reproducir grabaciones no se toca el almacén compartido con datos reales
+    store = None if replay.REPLAY_DIR else odds_cache.SQLiteStore()
+    return odds_cache.TTLCache(max_entries=256, store=store)
+
+# Huellas de /events por deporte: decide cuándo merece la pena gastar cuota en /odds
+@st.cache_resource(show_spinner=False)
+def get_event_gate():
+    return scheduler.EventGate()
+
+@st.cache_resource(show_spinner=False)
+def get_snapshot_store():
+    return snapshots.SnapshotStore()
+
+# Descargas fuera del hilo del script: si el usuario cambia de deporte a mitad de una
+# descarga lenta, el rerun corta la espera al momento en vez de esperar al timeout.
+# Un hilo por ejecución (no un pool compartido): una descarga abandonada no hace cola a la nueva
+def worker_init(ctx, token):
+    # Hilos de trabajo de este run: contexto de Streamlit y token de cancelación (reintentos)
+    def init():
+        if ctx:
+            add_script_run_ctx(threading.current_thread(), ctx)
+        resilience.bind_cancel_token(token)
+    return init
+
+def run_cancellable(fn, *args):
+    cancelled = threading.Event()  # token: lo marca este run al terminar o al ser interrumpido
+    init = worker_init(get_script_run_ctx(), cancelled)
+    done, outcome = threading.Event(), {}
+
+    def job():
+        init()
+        try:
+            outcome["value"] = fn(*args)
+        except BaseException as e:
+            outcome["error"] = e
+        finally:
+            done.set()
+    threading.Thread(target=job, name="odds-fetch", daemon=True).start()
+    status = st.empty()
+    t0 = time.perf_counter()
+    try:
+        # Cada mensaje al navegador es un punto donde Streamlit puede cortar el script
+        # (RerunException) si ha llegado una selección nueva; la descarga en curso termina sola
+        # (sin más reintentos) y su respuesta acaba en la caché, nunca en la tabla de esta ejecución
+        while not done.wait(0.25):
+            status.caption(f"⏳ {time.perf_counter() - t0:.1f}s")
+    finally:
+        cancelled.set()
+        status.empty()
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["value"]
+
+def describe_error(e):
+    # Con el cuerpo de la respuesta: la API explica ahí el motivo (OUT_OF_USAGE_CREDITS…)
+    if isinstance(e, requests.HTTPError) and e.response is not None:
+        try:
+            body = e.response.text.strip()
+        except Exception:
+            body = ""
+        return f"HTTP {e.response.status_code}: {body[:300]}" if body else f"HTTP {e.response.status_code}"
+    return str(e)
+
+def fetch_sports(api_key, ttl):
+    value, _ = get_odds_cache().get_or_fetch(
+        odds_cache.sports_key(), ttl,
+        lambda: odds_client.get_sports(get_http_session(), api_key, base_url=BASE_URL),
+        offline_errors=OFFLINE_ERRORS,
+    )
+    return value
+
+def fetch_events(sport_key, api_key):
+    session = get_http_session()
+    (events, _), _ = get_odds_cache().get_or_fetch(
+        odds_cache.events_key(sport_key), scheduler.EVENTS_TTL,
+        lambda: odds_client.get_events(session, sport_key, api_key, base_url=BASE_URL),
+        offline_errors=OFFLINE_ERRORS,
+    )
+    return events
+
+def fetch_odds(sport_key, regions, api_key, ttl, max_stale=0, markets=("h2h",), bookmakers=None, window_hours=None):
+    # Devuelve (data, headers, fetched_at); fetched_at identifica la respuesta para el planificador
+    session = get_http_session()  # se resuelve aquí: la revalidación corre fuera del script
+    (data, headers), fetched_at = get_odds_cache().get_or_fetch(
+        odds_cache.odds_key(sport_key, regions, markets, bookmakers, window_hours), ttl,
+        # commenceTimeTo se calcula al descargar: también las revalidaciones en segundo plano
+        lambda: odds_client.get_odds(session, sport_key, regions, api_key, markets, base_url=BASE_URL,
+                                     bookmakers=bookmakers, commence_to=scheduler.commence_window(window_hours)),
+        offline_errors=OFFLINE_ERRORS,
+        max_stale=max_stale,
+    )
+    return data, headers, fetched_at
 
 # ──────────────────────────────────────────────────────────────────────────────
 # 5) UI principal
 # ──────────────────────────────────────────────────────────────────────────────
-st.title("🔎 Arbitrage Finder — The Odds API (H2H 2-way)")
-
-with st.spinner("Cargando lista de deportes/torneos…"):
-    cache_buster_sports = int(time.time() // (ttl_seconds or 60))
-    all_sports = fetch_sports(API_KEY, cache_buster_sports)
-
-# Filtrado por texto
-def match_text(s, q):
-    q = q.strip().lower()
-    if not q:
-        return True
-    return q in (s.get("title","").lower()) or q in (s.get("key","").lower())
+st.title("🔎 Arbitrage Finder — The Odds API")
 
-sports_filtered = [s for s in all_sports if match_text(s, sport_search)]
+# Con el poller, la lista de deportes y los arbitrajes salen del último snapshot
+snapshot = None
+if use_snapshot:
+    snapshot = get_snapshot_store().latest()
+    if snapshot is None:
+        st.warning("El poller aún no ha publicado ningún snapshot. Arráncalo con `python poller.py` junto a la app.")
+        st.stop()
+    all_sports = [{"key": k, "title": v["title"]} for k, v in snapshot[2]["sports"].items()]
+else:
+    with st.spinner("Cargando lista de deportes/torneos…"):
+        all_sports = fetch_sports(API_KEY, ttl_seconds or 60)
 
-# (Opcional) lista de deportes con h2h de 2 resultados (heurística simple por nombre)
-two_way_hint_keywords = ["tennis", "basket", "nba", "ufc", "mma", "boxing", "nhl", "mlb", "nfl", "table_tennis", "volleyball", "darts"]
-if only_two_outcome_sports:
-    sports_filtered = [s for s in sports_filtered if any(k in (s.get("key","").lower()) for k in two_way_hint_keywords)]
+sports_filtered = arbs.filter_sports(all_sports, sport_search)
 
 if not sports_filtered:
-    st.warning("No se encontraron deportes con el filtro actual. Borra el texto de búsqueda o desmarca 'solo 2 resultados'.")
+    st.warning("No se encontraron deportes con el filtro actual. Borra el texto de búsqueda.")
     st.stop()
 
 sport_titles = [s.get("title") or s.get("key") for s in sports_filtered]
 sport_keys   = [s.get("key") for s in sports_filtered]
 selected_idx = 0
-selected_title = st.sidebar.selectbox("Deporte / Torneo", sport_titles, index=selected_idx)
+selected_title = st.sidebar.selectbox("Deporte / Torneo", sport_titles, index=selected_idx, disabled=scan_all)
 sport_key = sport_keys[sport_titles.index(selected_title)]
 
 with st.expander("ℹ️ Cómo funciona"):
     st.markdown("""
-- Descargamos **cuotas H2H** (moneyline) del **deporte/torneo** elegido.
-- Probamos todas las combinaciones de **dos casas** y verificamos si `1/odd_A + 1/odd_B < 1`.
-- Mostramos margen, stakes óptimos y beneficio para tu bankroll.
-> Nota: esta versión solo busca arbitrajes en **mercados H2H de 2 resultados**.
+- Descargamos las cuotas de los mercados elegidos del **deporte/torneo** (o de todos los filtrados en modo escaneo).
+- Con **2 resultados** (tenis, NBA…) probamos todas las combinaciones de dos casas: `1/odd_A + 1/odd_B < 1`.
+- Con **3 o más** (1X2 del fútbol…) tomamos la mejor casa de cada resultado: `1/odd_1 + 1/odd_X + 1/odd_2 < 1`.
+- Mostramos margen, stakes óptimos para cada pata y beneficio para tu bankroll.
     """)
 
 # ──────────────────────────────────────────────────────────────────────────────
 # 6) Descargar cuotas y detectar arbitrajes
 # ──────────────────────────────────────────────────────────────────────────────
-cache_buster_odds = int(time.time() // (ttl_seconds or 60))
-with st.spinner(f"Descargando cuotas de: {selected_title}…"):
+def discover_events(key, api_key):
+    # Eventos en la ventana o None si /events falló (entonces se piden cuotas igual)
     try:
-        data, headers = fetch_odds(sport_key, regions, API_KEY, cache_buster_odds)
-    except requests.HTTPError as e:
-        st.error(f"Error HTTP {e.response.status_code}: {e.response.text}")
-        st.stop()
-    except Exception as e:
-        st.error(f"Error: {e}")
-        st.stop()
+        return scheduler.events_in_window(fetch_events(key, api_key), window_hours)
+    except Exception:
+        return None
+
+def cached_floors(keys):
+    # Intervalo mínimo de cada deporte según el /events ya en caché (sin red), para repartir la cuota
+    floors = {}
+    for key in keys:
+        entry = get_odds_cache().peek(odds_cache.events_key(key))
+        if entry is not None:
+            events = scheduler.events_in_window(entry[0][0], window_hours)
+            if events:
+                floors[key] = scheduler.commence_ttl(scheduler.next_start(events), ttl_seconds or 60)
+    return floors
+
+def plan_fetch(key, events, keys, floors):
+    # -> (intervalo, ttl de la descarga o None para saltarla, huella de /events)
+    if events:
+        floors = dict(floors, **{key: scheduler.commence_ttl(scheduler.next_start(events), ttl_seconds or 60)})
+    interval = sched.intervals(keys, ttl_seconds or 60, floors=floors)[key]
+    if events is None:
+        return interval, interval, None
+    do_fetch, force, fingerprint = gate.decide(key, events)
+    if not do_fetch:
+        return interval, None, fingerprint
+    return interval, 0 if force else interval, fingerprint
+
+def scan_sports(keys_titles, regions, api_key, max_workers, max_stale=0):
+    # Cada deporte hace /events, decide y pide /odds en su propio hilo: sin una pasada previa de
+    # descubrimiento, el barrido tarda lo que el deporte más lento. Los hilos heredan el contexto
+    # de Streamlit (get_http_session/get_odds_cache son st.cache_resource)
+    init = worker_init(get_script_run_ctx(), resilience.current_cancel_token())
+    keys = [key for key, _ in keys_titles]
+    floors = cached_floors(keys)
+
+    def scan_one(key):
+        interval, ttl, fingerprint = plan_fetch(key, discover_events(key, api_key), keys, floors)
+        if ttl is None:
+            return interval, fingerprint, None
+        return interval, fingerprint, fetch_odds(key, regions, api_key, ttl, max_stale, markets, fetch_bookmakers,
+                                                 window_hours)
+
+    rows, failures, headers, fetched, intervals, fingerprints, skipped = [], [], {}, {}, {}, {}, []
+    with ThreadPoolExecutor(max_workers=max_workers, initializer=init) as pool:
+        futures = {pool.submit(scan_one, key): (key, title) for key, title in keys_titles}
+        # Procesamos cada respuesta según llega: el tiempo total lo marca la más lenta
+        for fut in as_completed(futures):
+            key, title = futures[fut]
+            try:
+                intervals[key], fingerprints[key], result = fut.result()
+            except Exception as e:
+                failures.append((title, describe_error(e)))
+                continue
+            if result is None:
+                skipped.append(key)
+                continue
+            data, h, fetched_at = result
+            fetched[key] = fetched_at
+            data = book_coverage.filter_bookmakers(data, allowed_books)
+            sport_rows = arbs.detect_rows(data, title, min_edge, bankroll, require_diff_books)
+            sched.observe(key, h, len(sport_rows), token=fetched_at)
+            rows.extend(sport_rows)
+            headers = lowest_quota(headers, h)
+    return rows, failures, headers, fetched, intervals, fingerprints, skipped
+
+def lowest_quota(current, h):
+    # Nos quedamos con la cabecera de cuota más baja (la más reciente)
+    rem = h.get("x-requests-remaining")
+    if rem is not None and (current.get("x-requests-remaining") is None
+                            or float(rem) < float(current["x-requests-remaining"])):
+        return h
+    return current
+
+def age_caption(fetched, ttls):
+    now = time.time()
+    stale = {k: now - ts for k, ts in fetched.items() if now - ts > ttls[k]}
+    if not stale:
+        oldest = max((now - ts for ts in fetched.values()), default=0.0)
+        return f"🕒 Cuotas de hace {oldest:.0f}s"
+    return (f"🕒 {len(stale)} de {len(fetched)} deportes con cuotas caducadas "
+            f"(la más vieja, de hace {max(stale.values()):.0f}s): actualizando en segundo plano…")
+
+# Cuando llega la revalidación en segundo plano, se relanza el script y la tabla cambia sola
+@st.fragment(run_every=2)
+def watch_revalidation(shown):
+    cache = get_odds_cache()
+    for key, fetched_at in shown.items():
+        entry = cache.peek(key)
+        if entry is not None and entry[1] > fetched_at:
+            st.rerun()
+
+# En modo snapshot basta con vigilar si el poller ha publicado una versión nueva
+@st.fragment(run_every=5)
+def watch_snapshot(version):
+    latest = get_snapshot_store().latest_version()
+    if latest is not None and latest > version:
+        st.rerun()
+
+if use_snapshot:
+    snap_version, snap_created, snap_body = snapshot
+    all_rows, headers = [], {}
+    for k in (sport_keys if scan_all else [sport_key]):
+        entry = snap_body["sports"][k]
+        all_rows.extend(arbs.arb_rows(entry["events"], entry["title"], min_edge, bankroll, require_diff_books))
+        headers = lowest_quota(headers, entry["headers"])
+    st.caption(f"📦 Snapshot v{snap_version} publicado hace {time.time() - snap_created:.0f}s "
+               f"(regiones del poller: {', '.join(snap_body['regions'])})")
+    watch_snapshot(snap_version)
+else:
+    sched = get_scheduler()
+    sched.reset_at = datetime.combine(quota_reset, datetime.min.time(), tzinfo=timezone.utc)
+    API_KEY.reset_at = sched.reset_at
+    poll_keys = sport_keys if scan_all else [sport_key]
+    # Paso gratuito: /events dice qué deportes tienen partidos y si ha aparecido alguno nuevo
+    gate = get_event_gate()
+
+    if scan_all:
+        workers = scan_workers or max(min(len(poll_keys), get_http_session().pool_maxsize), 1)
+        t0 = time.perf_counter()
+        with st.spinner(f"Escaneando {len(poll_keys)} deportes/torneos en paralelo…"):
+            all_rows, failures, headers, fetched, poll_intervals, fingerprints, skipped = run_cancellable(
+                scan_sports, list(zip(sport_keys, sport_titles)), regions, API_KEY, workers, max_stale
+            )
+        st.caption(f"⏱️ Barrido de {len(poll_keys) - len(skipped)} deportes en {time.perf_counter() - t0:.2f}s"
+                   f" con {workers} descargas en paralelo"
+                   + (f" · {len(skipped)} sin partidos en la ventana (sin gastar cuota)" if skipped else ""))
+        if failures:
+            st.warning("Fallaron algunas descargas: " + "; ".join(f"{t} ({err})" for t, err in failures))
+    else:
+        with st.spinner("Comprobando partidos programados…"):
+            events = run_cancellable(discover_events, sport_key, API_KEY)
+        # Partidos lejanos se refrescan poco; los que empiezan ya o están en juego, al ritmo del slider
+        interval, ttl, fingerprint = plan_fetch(sport_key, events, poll_keys, {})
+        poll_intervals, fingerprints = {sport_key: interval}, {sport_key: fingerprint}
+        if ttl is None:
+            st.info(f"{selected_title} no tiene partidos en la ventana elegida: no se piden cuotas (sin gastar cuota).")
+            all_rows, headers, fetched = [], {}, {}
+        else:
+            with st.spinner(f"Descargando cuotas de: {selected_title}…"):
+                try:
+                    data, headers, fetched_at = run_cancellable(fetch_odds, sport_key, regions, API_KEY, ttl,
+                                                                max_stale, markets, fetch_bookmakers, window_hours)
+                except requests.RequestException as e:
+                    # Los reintentos ya se agotaron: si hay una copia guardada se muestra en vez de parar
+                    stored = get_odds_cache().peek(odds_cache.odds_key(sport_key, regions, markets, fetch_bookmakers,
+                                                                      window_hours))
+                    if stored is None:
+                        st.error(f"Error: {describe_error(e)}")
+                        st.stop()
+                    (data, headers), fetched_at = stored
+                    st.warning(f"⚠️ La API falló ({describe_error(e)}): mostrando cuotas guardadas hace "
+                               f"{time.time() - fetched_at:.0f}s.")
+                    failed = True
+                except Exception as e:
+                    # Respuesta que no es la de la API (HTML de un proxy o portal cautivo, JSON inválido…)
+                    st.error(f"Error: {e}")
+                    st.stop()
+                else:
+                    failed = False
+            data = book_coverage.filter_bookmakers(data, allowed_books)
+            all_rows = arbs.detect_rows(data, selected_title, min_edge, bankroll, require_diff_books)
+            sched.observe(sport_key, headers, len(all_rows), token=fetched_at)
+            fetched = {sport_key: fetched_at}
+            age = time.time() - fetched_at
+            if not failed and age > poll_intervals[sport_key] + max_stale:
+                st.warning(f"📴 Sin conexión con la API: mostrando cuotas guardadas hace {age:.0f}s.")
+
+    for k in fetched:
+        gate.mark_fetched(k, fingerprints.get(k))
+
+    if fetched:
+        st.caption(age_caption(fetched, poll_intervals))
+    if any(time.time() - ts > poll_intervals[k] for k, ts in fetched.items()):
+        watch_revalidation({odds_cache.odds_key(k, regions, markets, fetch_bookmakers, window_hours): ts for k, ts in fetched.items()})
 
 # Métricas de uso de API
 colh1, colh2, colh3 = st.columns(3)
 colh1.metric("x-requests-remaining", headers.get("x-requests-remaining"))
 colh2.metric("x-requests-used", headers.get("x-requests-used"))
 colh3.metric("x-requests-last", headers.get("x-requests-last"))
+if not use_snapshot:
+    costs = odds_client.market_costs(headers, markets)
+    if costs:
+        st.caption("Coste por mercado en la última llamada: " + " · ".join(f"{m} {c:g}" for m, c in costs.items()))
+    if not scan_all and fetched:
+        # Tablas de cuotas por mercado, sacadas en una sola pasada del payload
+        with st.expander("📊 Cuotas por mercado"):
+            tables = arbs.split_markets(data)
+            if tables:
+                for tab, (m, quotes) in zip(st.tabs(list(tables)), tables.items()):
+                    tab.dataframe(pd.DataFrame(quotes), use_container_width=True)
+            else:
+                st.caption("El payload no trae cuotas.")
+
+if not use_snapshot:
+    with st.expander("📅 Planificación de cuota"):
+        rate = sched.budget_rate()
+        if rate is None:
+            st.caption("Aún no hay cabeceras de cuota: se usa el TTL del slider.")
+        else:
+            st.caption(f"Presupuesto hasta el reinicio: {rate * 86400:.1f} créditos/día "
+                       f"({sched.remaining:.0f} restantes, reinicio {quota_reset.isoformat()}).")
+        st.dataframe(pd.DataFrame(sched.snapshot(poll_keys, ttl_seconds or 60, floors=cached_floors(poll_keys))), use_container_width=True)
+        if len(API_KEY) > 1:
+            st.caption(f"Reparto entre {len(API_KEY)} API keys (las agotadas esperan al reinicio):")
+            st.dataframe(pd.DataFrame(API_KEY.stats()), use_container_width=True)
+
+    with st.expander("🗄️ Caché de respuestas"):
+        cstats = get_odds_cache().stats()
+        colc1, colc2, colc3, colc4 = st.columns(4)
+        colc1.metric("Entradas", f"{cstats['entries']}/{cstats['max_entries']}")
+        colc2.metric("Hits / misses", f"{cstats['hits']} / {cstats['misses']}")
+        colc3.metric("Hit rate", f"{cstats['hit_rate']:.0%}")
+        colc4.metric("Expulsiones", cstats["evictions"] + cstats["expirations"])
+        st.caption(f"Hits en disco: {cstats['disk_hits']} · Servidas sin conexión: {cstats['offline_served']} · "
+                   f"Stale servidas: {cstats['stale_served']} · Revalidando: {cstats['refreshing']} · "
+                   f"Llamadas duplicadas evitadas: {cstats['coalesced']} · "
+                   f"/odds ahorradas sin partidos: {gate.skipped} · Adelantadas por eventos nuevos: {gate.forced}")
 
-# Parseo y detección
-events = data if isinstance(data, list) else []
-all_rows = []
-for ev in events:
-    event_id = ev.get("id")
-    commence = ev.get("commence_time")
-    home = (ev.get("home_team") or "").strip()
-    away = (ev.get("away_team") or "").strip()
-    title = f"{home} vs {away}" if home and away else (ev.get("sport_title") or selected_title)
-
-    bks = ev.get("bookmakers", [])
-    arbs = best_two_outcome_arbs(bks, require_diff_books=require_diff_books)
-    arbs = [a for a in arbs if (a["edge"] * 100) >= min_edge]
-
-    for a in arbs:
-        s1, s2, edge, profit = stake_split(a["odd1"], a["odd2"], bankroll)
-        all_rows.append({
-            "event_id": event_id,
-            "match": title,
-            "start_time": commence,
-            "bk_outcome1": a["bk_outcome1"],
-            "outcome1": a["outcome1"],
-            "odd1": a["odd1"],
-            "bk_outcome2": a["bk_outcome2"],
-            "outcome2": a["outcome2"],
-            "odd2": a["odd2"],
-            "edge_%": round(edge * 100, 3),
-            "stake1": round(s1, 2),
-            "stake2": round(s2, 2),
-            "profit_€": round(profit, 2)
-        })
+    with st.expander("🛡️ Reintentos y circuit breaker"):
+        rstats = get_http_session().resilience.stats()
+        colr1, colr2, colr3, colr4 = st.columns(4)
+        colr1.metric("Reintentos", rstats["retries"])
+        colr2.metric("Espera acumulada", f"{rstats['wait_seconds']:.1f}s")
+        colr3.metric("Abandonos", rstats["giveups"])
+        colr4.metric("Cortados por circuito", rstats["short_circuits"])
+        st.caption("Circuitos: " + (", ".join(f"{k}={v}" for k, v in rstats["breakers"].items()) or "sin llamadas aún")
+                   + f" · Reintentos bloqueados por cuota baja: {rstats['floor_blocks']}")
 
 # Resultados
 st.subheader("💡 Oportunidades de arbitraje")
 if not all_rows:
-    st.info("No se encontraron arbitrajes H2H de 2 resultados con el umbral seleccionado. Prueba otro deporte/torneo, cambia regiones o baja el umbral.")
+    st.info("No se encontraron arbitrajes con el umbral seleccionado. Prueba otro deporte/torneo, cambia regiones o baja el umbral.")
 else:
-    df = pd.DataFrame(all_rows).sort_values(by="edge_%", ascending=False)
+    df = pd.DataFrame(all_rows, columns=arbs.row_columns(all_rows)).sort_values(by="edge_%", ascending=False)
+    if not scan_all:
+        df = df.drop(columns=["sport"])
     st.dataframe(df, use_container_width=True)
     csv = df.to_csv(index=False).encode("utf-8")
     st.download_button("Descargar CSV", data=csv, file_name="arbs.csv", mime="text/csv")
@@ -0,0 +1,624 @@
+# arbs.py
+# Detección de arbitrajes (2 o más resultados) y cálculo de stakes (sin dependencias de Streamlit).
+import unicodedata
+from functools import lru_cache
+from itertools import chain, product
+
+import numpy as np
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Filtrado de deportes
+# ──────────────────────────────────────────────────────────────────────────────
+def match_text(s, q):
+    q = q.strip().lower()
+    if not q:
+        return True
+    return q in (s.get("title","").lower()) or q in (s.get("key","").lower())
+
+def filter_sports(all_sports, search="", include_outrights=False):
+    # Los deportes de ganador del torneo (outrights) no tienen h2h/spreads/totals que comparar
+    sports = [s for s in all_sports if match_text(s, search)]
+    if not include_outrights:
+        sports = [s for s in sports if not s.get("has_outrights")]
+    return sports
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Motor de arbitraje
+# ──────────────────────────────────────────────────────────────────────────────
+@lru_cache(maxsize=65536)
+def normalize_name(name):
+    # "Carlos Alcaraz", "carlos  alcaraz" y "Carlos Alcaráz" son el mismo participante
+    text = unicodedata.normalize("NFKD", str(name or "")).encode("ascii", "ignore").decode()
+    return " ".join("".join(c if c.isalnum() else " " for c in text.lower()).split())
+
+def outcome_matrix(event_bookmakers, market="h2h", order=()):
+    # Cuotas de un evento alineadas por participante y no por posición en la lista de cada casa:
+    # {"names": [resultado k], "lines": {línea: {"books": [casa b], "quotes": [[outcome de b para k o None]]}}}
+    # order fija el orden canónico (local, visitante, Over, Under…); el resto va por orden de aparición
+    quoted, first_seen = [], {}
+    for bk in event_bookmakers:
+        for m in bk.get("markets", []):
+            if m.get("key") == market:
+                outs = [(normalize_name(o.get("name")), o) for o in m.get("outcomes", [])]
+                for key, o in outs:
+                    first_seen.setdefault(key, o.get("name"))
+                quoted.append((bk.get("title") or bk.get("key"), outs))
+    index, names = {}, []
+    for key, name in [(normalize_name(n), n) for n in order] + list(first_seen.items()):
+        if key in first_seen and key not in index:
+            index[key] = len(names)
+            names.append(first_seen[key])
+    lines = {}
+    for book, outs in quoted:
+        row = [None] * len(names)
+        for key, o in outs:
+            row[index[key]] = o
+        present = [o for o in row if o is not None]
+        if not present:
+            continue
+        line = present[0].get("point")  # hándicap / total del primer resultado canónico; None en h2h
+        block = lines.setdefault(line, {"books": [], "quotes": []})
+        block["books"].append(book)
+        block["quotes"].append(row)
+    return {"names": names, "lines": lines}
+
+def _price(o):
+    return float(o.get("price")) if o is not None and o.get("price") is not None else None
+
+def _row(book, line, o1, o2, names):
+    return {
+        "bookmaker": book,
+        "line": line,
+        "outcome1_name": o1.get("name") if o1 else names[0],
+        "outcome1_price": _price(o1),
+        "outcome1_point": o1.get("point") if o1 else None,
+        "outcome2_name": o2.get("name") if o2 else names[1],
+        "outcome2_price": _price(o2),
+        "outcome2_point": o2.get("point") if o2 else None,
+    }
+
+def _two_outcome_rows(event_bookmakers, market, order=()):
+    mx = outcome_matrix(event_bookmakers, market, order)
+    if len(mx["names"]) != 2:
+        return []  # ignoramos mercados con 3 resultados (ej. fútbol 1X2)
+    rows = []
+    for line, block in mx["lines"].items():
+        for book, (o1, o2) in zip(block["books"], block["quotes"]):
+            rows.append(_row(book, line, o1, o2, mx["names"]))
+    return rows
+
+def _arb(market, a, b, edge):
+    return _arb_legs(market, [
+        (a["bookmaker"], a["outcome1_name"], a["outcome1_point"], a["outcome1_price"]),
+        (b["bookmaker"], b["outcome2_name"], b["outcome2_point"], b["outcome2_price"]),
+    ], edge)
+
+def _arb_legs(market, legs, edge):
+    # legs = [(casa, resultado, punto, cuota)] en orden canónico. Además de la lista, claves planas
+    # bk_outcomeK / outcomeK / pointK / oddK, las de siempre para 2 resultados
+    arb = {"market": market, "legs": [], "edge": edge}
+    for k, (book, name, point, price) in enumerate(legs, 1):
+        arb["legs"].append({"bookmaker": book, "outcome": name, "point": point, "odd": price})
+        arb[f"point{k}"] = point
+        arb[f"bk_outcome{k}"] = book
+        arb[f"outcome{k}"] = name
+        arb[f"odd{k}"] = price
+    return arb
+
+def arb_legs(a):
+    # Las de snapshots antiguos (solo claves planas de 2 resultados) también valen
+    if a.get("legs"):
+        return a["legs"]
+    return [{"bookmaker": a[f"bk_outcome{k}"], "outcome": a[f"outcome{k}"], "point": a.get(f"point{k}"),
+             "odd": a[f"odd{k}"]} for k in (1, 2)]
+
+def best_two_outcome_arbs(event_bookmakers, require_diff_books=True, market="h2h", order=()):
+    # Por cada línea, la mejor cuota de cada resultado en una pasada: si ni 1/max1 + 1/max2 < 1
+    # no hay arbitraje posible. Si lo hay, solo se ordenan las cuotas que cumplen con la mejor del
+    # otro lado y se recorren las combinaciones que suman < 1: O(n + k log k + arbitrajes) en lugar
+    # de probar todos los pares. Las filas (_row) solo se construyen para las casas que salen.
+    # Mismo resultado y mismo orden que pairwise_two_outcome_arbs.
+    mx = outcome_matrix(event_bookmakers, market, order)
+    if len(mx["names"]) != 2:
+        return []
+    found, quotes, idx = [], [], 0
+    for line, block in mx["lines"].items():
+        side1, side2 = [], []
+        for book, (o1, o2) in zip(block["books"], block["quotes"]):
+            # idx: posición de la fila en _two_outcome_rows, para desempatar igual que el bucle de pares
+            quotes.append((book, line, o1, o2))
+            p1 = o1.get("price") if o1 is not None else None
+            p2 = o2.get("price") if o2 is not None else None
+            if p1:
+                side1.append((1.0 / float(p1), idx))
+            if p2:
+                side2.append((1.0 / float(p2), idx))
+            idx += 1
+        if not side1 or not side2:
+            continue
+        best1, best2 = min(side1)[0], min(side2)[0]
+        if best1 + best2 >= 1.0:
+            continue
+        side1 = sorted(t for t in side1 if t[0] + best2 < 1.0)
+        side2 = sorted(t for t in side2 if t[0] + best1 < 1.0)
+        for inv1, i in side1:
+            for inv2, j in side2:
+                inv_sum = inv1 + inv2
+                if inv_sum >= 1.0:
+                    break
+                if i == j and require_diff_books:
+                    continue
+                found.append((1.0 - inv_sum, i, j))
+    # Desempate como el bucle de pares: orden estable por (i, j)
+    found.sort(key=lambda t: (-t[0], t[1], t[2]))
+    rows = {}
+
+    def row(i):
+        r = rows.get(i)
+        if r is None:
+            book, line, o1, o2 = quotes[i]
+            r = rows[i] = _row(book, line, o1, o2, mx["names"])
+        return r
+    return [_arb(market, row(i), row(j), edge) for edge, i, j in found]
+
+def pairwise_two_outcome_arbs(event_bookmakers, require_diff_books=True, market="h2h", order=()):
+    # Versión de referencia O(n²): cada par de casas (se conserva para comparar en bench/)
+    rows = _two_outcome_rows(event_bookmakers, market, order)
+    arbs = []
+    for i in range(len(rows)):
+        for j in range(len(rows)):
+            if i == j and require_diff_books:
+                continue
+            a, b = rows[i], rows[j]
+            if not a["outcome1_price"] or not b["outcome2_price"]:
+                continue
+            if a["line"] != b["line"]:
+                continue  # solo se cruzan cuotas de la misma línea de hándicap / total
+            inv_sum = (1.0 / a["outcome1_price"]) + (1.0 / b["outcome2_price"])
+            if inv_sum < 1.0:
+                arbs.append(_arb(market, a, b, 1.0 - inv_sum))
+    arbs.sort(key=lambda d: d["edge"], reverse=True)
+    return arbs
+
+def _best_legs(sides, require_diff_books=True):
+    # sides[k] = [(1/cuota, casa)] ordenada: la mejor casa de cada resultado. Si una casa es la mejor
+    # en dos resultados y se exigen casas distintas, la mejor asignación sale de las n primeras
+    # de cada resultado (cada resultado choca como mucho con n - 1 casas)
+    if not all(sides):
+        return None
+    picks = [side[0] for side in sides]
+    if not require_diff_books or len({b for _, b in picks}) == len(picks):
+        return picks
+    best, best_sum = None, None
+    for combo in product(*(side[:len(sides)] for side in sides)):
+        if len({b for _, b in combo}) == len(combo):
+            total = sum(inv for inv, _ in combo)
+            if best is None or total < best_sum:
+                best, best_sum = list(combo), total
+    return best
+
+def _sides(quotes, n):
+    return [sorted((1.0 / _price(q[k]), b) for b, q in enumerate(quotes) if q[k] is not None and q[k].get("price"))
+            for k in range(n)]
+
+def _legs_arb(market, line, names, books, quotes, legs, edge):
+    return _arb_legs(market, [
+        (books[b], quotes[b][k].get("name") or names[k], quotes[b][k].get("point"), _price(quotes[b][k]))
+        for k, (_, b) in enumerate(legs)
+    ], edge)
+
+def _diff_books_arb(market, line, names, books, quotes, legs, sides):
+    # Sin exigir casas distintas solo queda la mejor combinación; si repite casa, se añade también
+    # la mejor con casas distintas (marcada diff_books_only) para que arb_rows pueda exigirlas
+    # después sobre lo ya detectado, como hace la UI con el snapshot del poller
+    if len({b for _, b in legs}) == len(legs):
+        return []
+    alt = _best_legs(sides, True)
+    if alt is None or sum(inv for inv, _ in alt) >= 1.0:
+        return []
+    return [dict(_legs_arb(market, line, names, books, quotes, alt, 1.0 - sum(inv for inv, _ in alt)),
+                 diff_books_only=True)]
+
+def best_outcome_arbs(event_bookmakers, require_diff_books=True, market="h2h", order=()):
+    # Mercados de 3 o más resultados (1X2…): por línea, la mejor casa de cada resultado y un único
+    # arbitraje si la suma de 1/cuota queda por debajo de 1. Con N resultados las combinaciones
+    # crecen como casas^N, así que no se enumeran como en best_two_outcome_arbs
+    mx = outcome_matrix(event_bookmakers, market, order)
+    n = len(mx["names"])
+    if n < 3:
+        return []
+    found = []
+    for line, block in mx["lines"].items():
+        sides = _sides(block["quotes"], n)
+        legs = _best_legs(sides, require_diff_books)
+        if legs is None:
+            continue
+        inv_sum = sum(inv for inv, _ in legs)
+        if inv_sum < 1.0:
+            found.append(_legs_arb(market, line, mx["names"], block["books"], block["quotes"], legs, 1.0 - inv_sum))
+        if not require_diff_books:
+            found.extend(_diff_books_arb(market, line, mx["names"], block["books"], block["quotes"], legs, sides))
+    found.sort(key=lambda d: d["edge"], reverse=True)
+    return found
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Detección por lotes: cuotas del lote en arrays y el cálculo de arbitrajes con NumPy
+# ──────────────────────────────────────────────────────────────────────────────
+# El cálculo con arrays es casi gratis; el coste está en recorrer los dicts del JSON para llenarlos
+# (pack_outcomes, 60-100 % del tiempo). Frente al bucle por evento queda en x1.4-x2
+# (bench/bench_vector_arbs.py), no en un orden de magnitud: para eso habría que parsear sin
+# pasar por objetos de Python
+BATCH_EVENTS = 256        # eventos por lote cuando la lista entera ya está en memoria
+STREAM_BATCH_CELLS = 512  # en flujo, cuotas por lote: solo esos eventos se retienen a la vez
+MAX_PAIR_CELLS = 1 << 22  # tope de celdas bloque × casa × casa al enumerar combinaciones
+
+def event_batches(data):
+    # Lotes para detect_arbs. Una lista ya está en memoria: trozos de BATCH_EVENTS.
+    # Un flujo (odds_client.iter_odds) se corta por número de cuotas para que la memoria siga
+    # plana: un lote de 256 eventos parseados pesa tanto como el payload entero
+    if data is None or isinstance(data, (dict, str)):
+        return
+    if isinstance(data, list):
+        for start in range(0, len(data), BATCH_EVENTS):
+            yield data[start:start + BATCH_EVENTS]
+        return
+    batch, cells = [], 0
+    for ev in data:
+        batch.append(ev)
+        cells += sum(len(m.get("outcomes", ())) for bk in ev.get("bookmakers", ()) for m in bk.get("markets", ()))
+        if cells >= STREAM_BATCH_CELLS or len(batch) >= BATCH_EVENTS:
+            yield batch
+            batch, cells = [], 0
+    if batch:
+        yield batch
+
+def pack_outcomes(events):
+    # Del JSON directamente a arrays, con el mismo alineado por nombre que outcome_matrix pero
+    # recorriendo cada evento una sola vez para todos sus mercados. Cada (evento, mercado, línea)
+    # es un bloque; se agrupan por número de resultados n:
+    # {n: (blocks, precios bloques × casas × n)}, NaN donde una casa no cotiza un resultado.
+    # blocks[b] = [evento, mercado, línea, nombres, [(casa, [outcome por resultado])], fila inicial]
+    groups = {}
+    nan = float("nan")
+    for ei, ev in enumerate(events):
+        order = {}
+        for name in event_order(ev):
+            order.setdefault(normalize_name(name), len(order))
+        per_market = {}
+        for bk in ev.get("bookmakers", ()):
+            book = bk.get("title") or bk.get("key")
+            for m in bk.get("markets", ()):
+                st = per_market.get(m.get("key"))
+                if st is None:
+                    st = per_market[m.get("key")] = ({}, {}, {}, [])
+                seen, ranks, names, quotes = st
+                cells, prices = {}, {}
+                for o in m.get("outcomes", ()):
+                    name = o.get("name")
+                    rank = seen.get(name)  # el nombre tal cual llega: normalize_name una vez por mercado
+                    if rank is None:
+                        key = normalize_name(name)
+                        rank = ranks.get(key)
+                        if rank is None:
+                            # El rango no cambia una vez visto: primero los de order, luego por aparición
+                            rank = ranks[key] = order.get(key, len(order) + len(ranks))
+                            names[rank] = name
+                        seen[name] = rank
+                    cells[rank] = o
+                    prices[rank] = o.get("price") or nan  # None o 0 -> NaN
+                if cells:
+                    quotes.append((book, cells, prices))
+        for market, (_, ranks, names, quotes) in per_market.items():
+            if len(ranks) < 2:
+                continue
+            canon_ranks = sorted(ranks.values())
+            canon = [names[r] for r in canon_ranks]
+            blocks, flat = groups.setdefault(len(canon), ([], []))
+            lines, offset = {}, 0
+            missing = [nan] * len(canon)
+            for book, cells, prices in quotes:
+                line = cells[min(cells)].get("point")  # la del primer resultado cotizado
+                block = lines.get(line)
+                if block is None:
+                    block = lines[line] = [ei, market, line, canon, [], 0, len(blocks)]
+                    blocks.append(block)
+                    flat.append([])
+                block[4].append((book, list(map(cells.get, canon_ranks))))
+                # Precios de la fila, seguidos por bloque para volcarlos de una vez
+                flat[block[6]].extend(map(prices.get, canon_ranks, missing))
+            for block in lines.values():  # índice de fila como en _two_outcome_rows (desempates idénticos)
+                block[5], offset = offset, offset + len(block[4])
+    packed = {}
+    for n, (blocks, flat) in groups.items():
+        counts = np.fromiter((len(b[4]) for b in blocks), np.intp, len(blocks))
+        prices = np.full((len(blocks), counts.max(), n), np.nan)
+        # Filas ocupadas de cada bloque, en el mismo orden (bloque, fila) en que se volcaron
+        prices[np.arange(prices.shape[1]) < counts[:, None]] = np.fromiter(
+            chain.from_iterable(flat), float, int(counts.sum()) * n).reshape(-1, n)
+        packed[n] = (blocks, prices)
+    return packed
+
+def _detect_two(blocks, inv, found, require_diff_books):
+    # Todas las combinaciones casa i (resultado 1) × casa j (resultado 2) que suman < 1, como
+    # best_two_outcome_arbs; primero se descartan los bloques en los que ni las mejores cuotas llegan
+    best = np.where(np.isnan(inv), np.inf, inv).min(axis=1)
+    candidates = np.nonzero(best.sum(axis=1) < 1.0)[0]
+    width = inv.shape[1]
+    step = max(1, MAX_PAIR_CELLS // (width * width))
+    hits = {}
+    for start in range(0, len(candidates), step):
+        chunk = candidates[start:start + step]
+        sums = inv[chunk, :, 0][:, :, None] + inv[chunk, :, 1][:, None, :]
+        ok = sums < 1.0
+        if require_diff_books:
+            ok[:, np.arange(width), np.arange(width)] = False
+        cs, ii, jj = np.nonzero(ok)
+        edges = 1.0 - sums[cs, ii, jj]
+        for c, i, j, edge in zip(chunk[cs].tolist(), ii.tolist(), jj.tolist(), edges.tolist()):
+            block = blocks[c]
+            hits.setdefault((block[0], block[1]), []).append((edge, block[5] + i, block[5] + j, c, i, j))
+    for (ei, market), found_here in hits.items():
+        found_here.sort(key=lambda t: (-t[0], t[1], t[2]))
+        rows = []
+        for edge, _, _, c, i, j in found_here:
+            _, _, line, names, entries = blocks[c][:5]
+            (book_a, (a1, a2)), (book_b, (b1, b2)) = entries[i], entries[j]
+            rows.append(_arb(market, _row(book_a, line, a1, a2, names), _row(book_b, line, b1, b2, names), edge))
+        found[ei][market] = rows
+
+def _detect_legs(blocks, inv, found, require_diff_books):
+    # 3 o más resultados: mejor casa por resultado (argmin de 1/cuota) y suma, para todos los bloques
+    # a la vez, como best_outcome_arbs. Solo los bloques con la misma casa en dos resultados se
+    # resuelven aparte
+    masked = np.where(np.isnan(inv), np.inf, inv)
+    picks = masked.argmin(axis=1)
+    best = np.take_along_axis(masked, picks[:, None, :], axis=1)[:, 0, :]
+    n = inv.shape[2]
+    hits = {}
+    for c in np.nonzero(best.sum(axis=1) < 1.0)[0].tolist():
+        ei, market, line, names, entries = blocks[c][:5]
+        books, quotes = [b for b, _ in entries], [row for _, row in entries]
+        legs = list(zip(best[c].tolist(), picks[c].tolist()))
+        alt = []
+        if len(set(picks[c].tolist())) < n:
+            if require_diff_books:
+                legs = _best_legs(_sides(quotes, n), True)
+                if legs is None:
+                    continue
+            else:
+                alt = _diff_books_arb(market, line, names, books, quotes, legs, _sides(quotes, n))
+        inv_sum = sum(inv for inv, _ in legs)
+        if inv_sum < 1.0:
+            hits.setdefault((ei, market), []).append(_legs_arb(market, line, names, books, quotes, legs, 1.0 - inv_sum))
+        hits.setdefault((ei, market), []).extend(alt)
+    for (ei, market), rows in hits.items():
+        rows.sort(key=lambda d: d["edge"], reverse=True)
+        found[ei][market] = rows
+
+def detect_arbs(events, require_diff_books=True):
+    # -> por evento, {mercado: arbitrajes} con el mismo contenido y orden que best_two_outcome_arbs
+    # (2 resultados) y best_outcome_arbs (3 o más), para todo el lote de eventos a la vez
+    found = [{} for _ in events]
+    for n, (blocks, prices) in sorted(pack_outcomes(events).items()):
+        inv = 1.0 / prices
+        if n == 2:
+            _detect_two(blocks, inv, found, require_diff_books)
+        else:
+            _detect_legs(blocks, inv, found, require_diff_books)
+    return found
+
+def split_stakes(odds, bankroll):
+    # Reparto proporcional a 1/cuota: cobra lo mismo gane el resultado que gane, con N patas
+    invs = [1.0/odd for odd in odds]
+    denom = sum(invs)
+    stakes = [bankroll * (inv / denom) for inv in invs]
+    edge = 1.0 - denom
+    profit = bankroll * edge
+    return stakes, edge, profit
+
+def stake_split(odd1, odd2, bankroll):
+    (s1, s2), edge, profit = split_stakes((odd1, odd2), bankroll)
+    return s1, s2, edge, profit
+
+# ──────────────────────────────────────────────────────────────────────────────
+# De payload de la API a filas de la tabla
+# ──────────────────────────────────────────────────────────────────────────────
+def event_title(ev, fallback):
+    home = (ev.get("home_team") or "").strip()
+    away = (ev.get("away_team") or "").strip()
+    return f"{home} vs {away}" if home and away else (ev.get("sport_title") or fallback)
+
+def split_markets(data):
+    # Una sola pasada por bookmakers[].markets[]: {mercado: [una fila por cuota]}
+    tables = {}
+    for ev in (data if isinstance(data, list) else []):
+        event_id = ev.get("id")
+        commence = ev.get("commence_time")
+        for bk in ev.get("bookmakers", []):
+            name = bk.get("title") or bk.get("key")
+            for m in bk.get("markets", []):
+                rows = tables.setdefault(m.get("key"), [])
+                updated = m.get("last_update") or bk.get("last_update")
+                for o in m.get("outcomes", []):
+                    rows.append({
+                        "event_id": event_id,
+                        "start_time": commence,
+                        "bookmaker": name,
+                        "outcome": o.get("name"),
+                        "point": o.get("point"),
+                        "price": o.get("price"),
+                        "last_update": updated,
+                    })
+    return tables
+
+def event_order(ev):
+    # Orden canónico de resultados del evento: local, empate, visitante (1X2) y luego los de totales
+    return tuple(n for n in (ev.get("home_team"), "Draw", ev.get("away_team")) if n) + ("Over", "Under")
+
+def event_markets(ev):
+    keys = []
+    for bk in ev.get("bookmakers", []):
+        for m in bk.get("markets", []):
+            if m.get("key") not in keys:
+                keys.append(m.get("key"))
+    return keys
+
+def _event_entry(ev, by_market, sport_title):
+    arbs = [a for market in event_markets(ev) for a in by_market.get(market, [])]
+    arbs.sort(key=lambda d: d["edge"], reverse=True)
+    if not arbs:
+        return None
+    return {
+        "event_id": ev.get("id"),
+        "match": event_title(ev, sport_title),
+        "start_time": ev.get("commence_time"),
+        "arbs": arbs,
+    }
+
+def event_arbs(data, sport_title, require_diff_books=True):
+    # Eventos con al menos un arbitraje, sin filtrar por margen (lo publica el poller tal cual)
+    # data puede ser la lista completa o un flujo de eventos (odds_client.iter_odds): se
+    # procesa por lotes (event_batches) con detect_arbs
+    out = []
+    for batch in event_batches(data):
+        for ev, by_market in zip(batch, detect_arbs(batch, require_diff_books)):
+            entry = _event_entry(ev, by_market, sport_title)
+            if entry is not None:
+                out.append(entry)
+    return out
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Detección incremental entre refrescos
+# ──────────────────────────────────────────────────────────────────────────────
+def event_fingerprint(ev):
+    # last_update de cada casa y mercado, más lo que cambia el título o el orden de resultados.
+    # None si alguna cotización no trae marca de tiempo: entonces no se sabe si cambió
+    parts = [ev.get("commence_time"), ev.get("home_team"), ev.get("away_team")]
+    for bk in ev.get("bookmakers", ()):
+        stamp = bk.get("last_update")
+        markets = tuple((m.get("key"), m.get("last_update") or stamp) for m in bk.get("markets", ()))
+        if any(updated is None for _, updated in markets):
+            return None
+        parts.append((bk.get("key"), markets))
+    return tuple(parts)
+
+def arb_key(a):
+    # Identidad de un arbitraje entre refrescos: mercado y, por pata, casa, resultado y línea
+    return a.get("market", "h2h"), tuple((leg["bookmaker"], leg["outcome"], leg.get("point")) for leg in arb_legs(a))
+
+class IncrementalArbs:
+    # Arbitrajes de un deporte a lo largo de sus refrescos: por evento guarda la huella de
+    # last_update y el último resultado, y solo vuelve a evaluar los eventos cuya huella cambió.
+    # Cada actualización devuelve los arbitrajes nuevos, desaparecidos y con cuotas distintas.
+    def __init__(self, sport_title, require_diff_books=True):
+        self.sport_title = sport_title
+        self.require_diff_books = require_diff_books
+        self.events = {}  # event_id -> (huella, entrada como las de event_arbs o None)
+        self.evaluated = 0
+        self.skipped = 0
+
+    def update(self, data, complete=True):
+        # -> (eventos con arbitraje, igual que event_arbs(data), {"added", "removed", "changed"})
+        # complete=False para refrescos parciales (/events/{id}/odds): los eventos que no vienen se
+        # conservan; con el deporte completo, los que faltan han empezado o salido de la ventana
+        changes = {"added": [], "removed": [], "changed": []}
+        seen = {}
+        for batch in event_batches(data):
+            stale = []
+            for ev in batch:
+                fingerprint = event_fingerprint(ev)
+                seen[ev.get("id")] = True
+                known = self.events.get(ev.get("id"))
+                if fingerprint is not None and known is not None and known[0] == fingerprint:
+                    self.skipped += 1
+                else:
+                    stale.append((ev, fingerprint))
+            if not stale:
+                continue
+            self.evaluated += len(stale)
+            for (ev, fingerprint), by_market in zip(stale, detect_arbs([ev for ev, _ in stale], self.require_diff_books)):
+                entry = _event_entry(ev, by_market, self.sport_title)
+                _, before = self.events.get(ev.get("id"), (None, None))
+                self._diff(before, entry, changes)
+                self.events[ev.get("id")] = (fingerprint, entry)
+        if complete:
+            for event_id in [e for e in self.events if e not in seen]:
+                self._diff(self.events.pop(event_id)[1], None, changes)
+            # Mismo orden que el payload, como event_arbs
+            self.events = {e: self.events[e] for e in seen}
+        return self.entries(), changes
+
+    def remove(self, event_id):
+        # El evento ya no existe (404 en /events/{id}/odds)
+        changes = {"added": [], "removed": [], "changed": []}
+        if event_id in self.events:
+            self._diff(self.events.pop(event_id)[1], None, changes)
+        return self.entries(), changes
+
+    def entries(self):
+        return [entry for _, entry in self.events.values() if entry is not None]
+
+    def stats(self):
+        return {"events": len(self.events), "evaluated": self.evaluated, "skipped": self.skipped}
+
+    @staticmethod
+    def _diff(before, after, changes):
+        old = {arb_key(a): a for a in (before or {}).get("arbs", [])}
+        new = {arb_key(a): a for a in (after or {}).get("arbs", [])}
+        for key, a in new.items():
+            if key not in old:
+                changes["added"].append(_change(after, a))
+            elif old[key] != a:
+                changes["changed"].append(dict(_change(after, a), previous=old[key]))
+        for key, a in old.items():
+            if key not in new:
+                changes["removed"].append(_change(before, a))
+
+def _change(entry, a):
+    return {"event_id": entry["event_id"], "match": entry["match"], "start_time": entry["start_time"], "arb": a}
+
+def outcome_label(name, point, market="h2h"):
+    if point is None:
+        return name
+    return f"{name} {point:g}" if market == "totals" else f"{name} {point:+g}"
+
+def arb_rows(events, sport_title, min_edge, bankroll, require_diff_books=True):
+    rows = []
+    for ev in events:
+        for a in ev["arbs"]:
+            if (a["edge"] * 100) < min_edge:
+                continue
+            legs = arb_legs(a)
+            if require_diff_books and len({leg["bookmaker"] for leg in legs}) < len(legs):
+                continue
+            if not require_diff_books and a.get("diff_books_only"):
+                continue
+            market = a.get("market", "h2h")
+            stakes, edge, profit = split_stakes([leg["odd"] for leg in legs], bankroll)
+            row = {
+                "sport": sport_title,
+                "event_id": ev["event_id"],
+                "match": ev["match"],
+                "start_time": ev["start_time"],
+                "market": market,
+            }
+            for k, leg in enumerate(legs, 1):
+                row[f"bk_outcome{k}"] = leg["bookmaker"]
+                row[f"outcome{k}"] = outcome_label(leg["outcome"], leg.get("point"), market)
+                row[f"odd{k}"] = leg["odd"]
+            row["edge_%"] = round(edge * 100, 3)
+            for k, stake in enumerate(stakes, 1):
+                row[f"stake{k}"] = round(stake, 2)
+            row["profit_€"] = round(profit, 2)
+            rows.append(row)
+    return rows
+
+def row_columns(rows):
+    # Columnas de la tabla para el máximo de patas: las filas de 2 resultados dejan vacías las de la 3.ª
+    legs = max((sum(1 for c in r if c.startswith("odd")) for r in rows), default=2)
+    return (["sport", "event_id", "match", "start_time", "market"]
+            + [f"{c}{k}" for k in range(1, legs + 1) for c in ("bk_outcome", "outcome", "odd")]
+            + ["edge_%"] + [f"stake{k}" for k in range(1, legs + 1)] + ["profit_€"])
+
+def detect_rows(data, sport_title, min_edge, bankroll, require_diff_books=True):
+    return arb_rows(event_arbs(data, sport_title, require_diff_books), sport_title, min_edge, bankroll, require_diff_books)
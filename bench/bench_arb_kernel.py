@@ -0,0 +1,50 @@
+# bench/bench_arb_kernel.py
+# best_two_outcome_arbs (mejor cuota por resultado) frente al bucle de pares O(n²), según el número de casas.
+# Comprueba además que ambos devuelven exactamente lo mismo.
+# Uso: python bench/bench_arb_kernel.py [--books 4,10,20,40,80,160] [--events 200] [--markets h2h,spreads,totals]
+#                                      [--repeat 5]
+import argparse
+import gc
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import arbs  # noqa: E402
+import mock_server  # noqa: E402
+
+def build(n_books, n_events, markets, seed=7):
+    books = tuple(f"book_{b:03d}" for b in range(n_books))
+    return [mock_server.build_event(seed, "tennis_atp_bench", i, books, markets, 0, 30.0, 0)["bookmakers"]
+            for i in range(n_events)]
+
+def timed(fn, events, markets, require_diff_books, repeat):
+    # Mejor de repeat vueltas: con pocas casas cada vuelta dura milisegundos y el ruido pesa
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        gc.collect()
+        t0 = time.perf_counter()
+        out = [fn(bks, require_diff_books, m) for bks in events for m in markets]
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--books", default="4,10,20,40,80,160")
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--markets", default="h2h,spreads,totals")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+    markets = tuple(args.markets.split(","))
+    print(f"{args.events} eventos, mercados {','.join(markets)}")
+    for n in (int(b) for b in args.books.split(",")):
+        events = build(n, args.events, markets)
+        for diff in (True, False):
+            t_pair, ref = timed(arbs.pairwise_two_outcome_arbs, events, markets, diff, args.repeat)
+            t_fast, out = timed(arbs.best_two_outcome_arbs, events, markets, diff, args.repeat)
+            assert out == ref, f"resultados distintos con {n} casas"
+            print(f"casas {n:4d} diff={diff!s:5} | pares {t_pair * 1000:9.1f} ms | mejor cuota {t_fast * 1000:8.1f} ms"
+                  f" | x{t_pair / t_fast:5.1f} | arbitrajes {sum(map(len, out))}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# bench/bench_commence_window.py
+# Tamaño de /odds y tiempo de parseo con y sin commenceTimeTo, sobre torneos grandes de ATP/WTA.
+# Uso: python bench/bench_commence_window.py [--events 200] [--books 40] [--windows 0,6,24,72] [--repeat 20]
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import mock_server  # noqa: E402
+import odds_client  # noqa: E402
+import scheduler  # noqa: E402
+
+def measure(session, base_url, sport_key, regions, markets, window_hours, repeat):
+    params = {"apiKey": "bench", "regions": ",".join(regions), "markets": ",".join(markets), "oddsFormat": "decimal"}
+    commence_to = scheduler.commence_window(window_hours)
+    if commence_to:
+        params["commenceTimeTo"] = commence_to
+    r = session.get(f"{base_url}/sports/{sport_key}/odds", params=params, timeout=30)
+    r.raise_for_status()
+    wire = int(r.headers.get("Content-Length") or len(r.content))
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        data = r.json()
+        times.append(time.perf_counter() - t0)
+    return len(data), wire, len(r.content), statistics.median(times)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=200, help="Partidos por torneo (cada ~1,5 h)")
+    parser.add_argument("--books", type=int, default=40)
+    parser.add_argument("--windows", default="0,6,24,72", help="Horas de ventana (0 = sin límite)")
+    parser.add_argument("--markets", default="h2h,spreads,totals")
+    parser.add_argument("--regions", default="uk,eu")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+    cfg = mock_server.MockConfig(sports=2, events=args.events, books=args.books, quota=10 ** 9)
+    server = mock_server.serve(cfg)
+    try:
+        session = odds_client.build_session(capture=False, retries=False)
+        keys = [s["key"] for s in odds_client.get_sports(session, "bench", base_url=server.base_url)]
+        tennis = [k for k in keys if k.startswith("tennis_")] or keys
+        print(f"{args.events} partidos por torneo, {args.books} casas, mercados {args.markets}")
+        for sport_key in tennis:
+            base = None
+            for w in (int(x) for x in args.windows.split(",")):
+                n, wire, raw, t = measure(session, server.base_url, sport_key, args.regions.split(","),
+                                          args.markets.split(","), w, args.repeat)
+                base = base or (raw, t)
+                label = f"{w}h" if w else "sin ventana"
+                print(f"{sport_key:18s} {label:>12s} | eventos {n:4d} | gzip {wire / 1024:8.1f} KiB"
+                      f" | json {raw / 1024:9.1f} KiB ({raw / base[0]:5.1%}) | parseo {t * 1000:7.2f} ms ({t / base[1]:5.1%})")
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# bench/bench_http_pool.py
+# Latencia fría vs caliente: requests.get suelto frente a la sesión con pool de odds_client.
+# Uso: python bench/bench_http_pool.py [n_peticiones]
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import odds_client  # noqa: E402
+
+PAYLOAD = json.dumps([{"key": f"tennis_{i}", "title": f"Tennis {i}"} for i in range(50)]).encode()
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, como el servidor real
+    disable_nagle_algorithm = True  # evita los 40 ms de delayed-ACK entre cabeceras y cuerpo
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(PAYLOAD)))
+        self.end_headers()
+        self.wfile.write(PAYLOAD)
+
+    def log_message(self, *args):
+        pass
+
+def timed(fn, n):
+    out = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        fn()
+        out.append((time.perf_counter() - t0) * 1000)
+    return out
+
+def report(label, samples):
+    cold, warm = samples[0], samples[1:]
+    print(f"{label:<22} fría {cold:7.2f} ms | caliente p50 {statistics.median(warm):6.2f} ms"
+          f" | media {statistics.mean(warm):6.2f} ms | total {sum(samples):8.1f} ms")
+
+def main(n=200):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}/v4"
+    try:
+        bare = timed(lambda: requests.get(f"{base}/sports", params={"apiKey": "x"}, timeout=5).json(), n)
+        session = odds_client.build_session(capture=False)
+        pooled = timed(lambda: odds_client.get_sports(session, "x", base_url=base, timeout=5), n)
+    finally:
+        server.shutdown()
+    print(f"{n} peticiones contra stub local ({len(PAYLOAD)} bytes)")
+    report("requests.get", bare)
+    report("sesión con pool", pooled)
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,57 @@
+# bench/bench_incremental_arbs.py
+# Refrescos sucesivos de un deporte con arbs.IncrementalArbs frente a event_arbs desde cero: en el mock
+# cada casa cambia de cuotas (y de last_update) una vez cada --drift segundos y se refresca cada --step.
+# Comprueba que el resultado coincide y cuenta los arbitrajes nuevos, desaparecidos y cambiados.
+# Uso: python bench/bench_incremental_arbs.py [--events 500] [--books 40] [--drift 600] [--steps 5,30,120] [--rounds 5]
+import argparse
+import gc
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import arbs  # noqa: E402
+import mock_server  # noqa: E402
+
+def payload(n_events, books, markets, bucket, drift, seed=7):
+    return [mock_server.build_event(seed, "tennis_bench", i, books, markets, bucket, drift, 0) for i in range(n_events)]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=500)
+    parser.add_argument("--books", type=int, default=40)
+    parser.add_argument("--markets", default="h2h,spreads,totals")
+    parser.add_argument("--drift", type=float, default=600.0, help="Segundos entre cambios de cuota de cada casa")
+    parser.add_argument("--steps", default="5,30,120", help="Segundos entre refrescos")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args(argv)
+    books = tuple(f"book_{b:03d}" for b in range(args.books))
+    markets = tuple(args.markets.split(","))
+    for step in (float(x) for x in args.steps.split(",")):
+        snapshots = [payload(args.events, books, markets, r * step, args.drift) for r in range(args.rounds + 1)]
+        tracker = arbs.IncrementalArbs("bench")
+        tracker.update(snapshots[0])
+        gc.collect()
+        gc.freeze()  # los snapshots no son basura: que el GC no los recorra en cada medición
+        t_full = t_inc = 0.0
+        counts = {"added": 0, "removed": 0, "changed": 0}
+        evaluated = tracker.evaluated
+        for data in snapshots[1:]:
+            t0 = time.perf_counter()
+            ref = arbs.event_arbs(data, "bench")
+            t_full += time.perf_counter() - t0
+            t0 = time.perf_counter()
+            out, changes = tracker.update(data)
+            t_inc += time.perf_counter() - t0
+            assert out == ref, f"resultados distintos con refresco cada {step:g} s"
+            for kind, items in changes.items():
+                counts[kind] += len(items)
+        gc.unfreeze()
+        share = (tracker.evaluated - evaluated) / (args.events * args.rounds)
+        print(f"refresco cada {step:5g} s | {args.events} eventos x {args.books} casas | desde cero"
+              f" {t_full / args.rounds * 1000:7.1f} ms | incremental {t_inc / args.rounds * 1000:7.1f} ms"
+              f" (x{t_full / t_inc:5.1f}, {share:6.1%} eventos reevaluados) | por refresco +{counts['added'] / args.rounds:.1f}"
+              f" -{counts['removed'] / args.rounds:.1f} ~{counts['changed'] / args.rounds:.1f} arbitrajes")
+
+if __name__ == "__main__":
+    main()
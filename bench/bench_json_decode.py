@@ -0,0 +1,98 @@
+# bench/bench_json_decode.py
+# r.json() frente a odds_client.decode_json (orjson / json) y al parseo en flujo de iter_json_array,
+# sobre respuestas /odds grabadas: tiempo de parseo + detección y pico de memoria.
+# Uso: python bench/bench_json_decode.py [--dir grabaciones/] [--events 50,200,800] [--books 40]
+# Sin --dir se graban respuestas del mock en un directorio temporal con replay.Recorder.
+import argparse
+import gc
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from requests import Response
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import arbs  # noqa: E402
+import mock_server  # noqa: E402
+import odds_client  # noqa: E402
+import replay  # noqa: E402
+
+def record_mock(directory, events, books, markets):
+    for n in events:
+        cfg = mock_server.MockConfig(sports=1, events=n, books=books, quota=10 ** 9)
+        server = mock_server.serve(cfg)
+        try:
+            session = odds_client.build_session(capture=False, retries=False)
+            replay.attach_recorder(session, directory)
+            key = odds_client.get_sports(session, "bench", base_url=server.base_url)[0]["key"]
+            odds_client.get_odds(session, key, ["uk", "eu", "us"], "bench", markets, base_url=server.base_url)
+        finally:
+            server.shutdown()
+
+def requests_json(body):
+    r = Response()
+    r._content = body
+    r.status_code = 200
+    return r.json()
+
+def stdlib_json(body):
+    orjson, odds_client.orjson = odds_client.orjson, None
+    try:
+        return odds_client.decode_json(body)
+    finally:
+        odds_client.orjson = orjson
+
+def streamed(body):
+    return odds_client.iter_json_array(body[i:i + odds_client.STREAM_CHUNK]
+                                       for i in range(0, len(body), odds_client.STREAM_CHUNK))
+
+def run(label, parse, body, repeat):
+    # Solo parseo, y parseo + detección: en flujo cada evento se suelta en cuanto se analiza
+    parse_times, total_times = [], []
+    for _ in range(repeat):
+        gc.collect()  # que la basura de la vuelta anterior no caiga en esta medida
+        t0 = time.perf_counter()
+        for _ev in parse(body):
+            pass
+        parse_times.append(time.perf_counter() - t0)
+        gc.collect()
+        t0 = time.perf_counter()
+        n = len(arbs.event_arbs(parse(body), "bench"))
+        total_times.append(time.perf_counter() - t0)
+    tracemalloc.start()
+    arbs.event_arbs(parse(body), "bench")
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return (f"{label:12s} parseo {statistics.median(parse_times) * 1000:8.1f} ms"
+            f" | + detección {statistics.median(total_times) * 1000:8.1f} ms"
+            f" | pico {peak / 2 ** 20:7.1f} MiB | {n} con arbitraje")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dir", help="Directorio con grabaciones .json.gz (ODDS_RECORD_DIR)")
+    parser.add_argument("--events", default="50,200,800", help="Tamaños a grabar del mock si no hay --dir")
+    parser.add_argument("--books", type=int, default=40)
+    parser.add_argument("--markets", default="h2h,spreads,totals")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = args.dir
+        if not directory:
+            directory = tmp
+            record_mock(directory, [int(n) for n in args.events.split(",")], args.books, args.markets.split(","))
+        recordings = replay.load_recordings(directory)
+    print(f"orjson: {'sí' if odds_client.orjson is not None else 'no instalado'}")
+    payloads = [(rec["key"], rec["body"].encode("utf-8")) for key, recs in recordings.items()
+                for rec in recs if "/odds" in key and rec["status"] == 200]
+    for key, body in sorted(payloads, key=lambda kb: len(kb[1])):
+        print(f"\n{key[:70]}  ({body.count(b'commence_time')} eventos, {len(body) / 2 ** 20:.1f} MiB)")
+        print(run("r.json()", requests_json, body, args.repeat))
+        print(run("json", stdlib_json, body, args.repeat))
+        print(run("decode_json", odds_client.decode_json, body, args.repeat))
+        print(run("flujo", streamed, body, args.repeat))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# bench/bench_mock_load.py
+# Carga sobre la ruta de descarga y el motor de arbitraje contra mock_server.py, a varias escalas.
+# Uso: python bench/bench_mock_load.py [--scales 1,10,100] [--sports 8] [--workers 8] [--latency-ms 50]
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import arbs  # noqa: E402
+import mock_server  # noqa: E402
+import odds_client  # noqa: E402
+
+BASE_EVENTS, BASE_BOOKS = 20, 16  # tamaño aproximado de un torneo real en uk,eu
+
+def run_scale(scale, sports, workers, latency_ms, regions):
+    # La escala se reparte entre eventos y casas (x10 = ~x3.2 eventos y ~x3.2 casas)
+    factor = scale ** 0.5
+    cfg = mock_server.MockConfig(
+        sports=sports, events=max(1, round(BASE_EVENTS * factor)), books=max(4, round(BASE_BOOKS * factor)),
+        latency_ms=latency_ms, quota=10 ** 9,
+    )
+    server = mock_server.serve(cfg)
+    try:
+        session = odds_client.build_session(pool_maxsize=workers, capture=False)
+        keys = [s["key"] for s in odds_client.get_sports(session, "bench", base_url=server.base_url)]
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            payloads = list(pool.map(
+                lambda k: odds_client.get_odds(session, k, regions, "bench", base_url=server.base_url)[0], keys
+            ))
+        t_fetch = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        n_arbs = sum(len(ev["arbs"]) for data in payloads for ev in arbs.event_arbs(data, "bench"))
+        t_detect = time.perf_counter() - t0
+    finally:
+        server.shutdown()
+    n_events = sum(len(p) for p in payloads)
+    n_books = len(payloads[0][0]["bookmakers"]) if payloads and payloads[0] else 0
+    print(f"x{scale:<4} eventos {n_events:6d} | casas/evento {n_books:4d} | descarga {t_fetch * 1000:8.1f} ms"
+          f" | detección {t_detect * 1000:9.1f} ms | arbitrajes {n_arbs}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scales", default="1,10,100")
+    parser.add_argument("--sports", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--regions", default="uk,eu")
+    args = parser.parse_args(argv)
+    print(f"{args.sports} deportes, {args.workers} hilos, latencia simulada {args.latency_ms:g} ms, regiones {args.regions}")
+    for scale in (int(s) for s in args.scales.split(",")):
+        run_scale(scale, args.sports, args.workers, args.latency_ms, args.regions.split(","))
+
+if __name__ == "__main__":
+    main()
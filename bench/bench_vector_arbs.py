@@ -0,0 +1,92 @@
+# bench/bench_vector_arbs.py
+# Detección de arbitrajes en un snapshot multideporte (mitad tenis, mitad fútbol 1X2): bucle por evento
+# con best_two_outcome_arbs / best_outcome_arbs frente a la detección por lotes de arbs.event_arbs
+# (NumPy). Comprueba que coinciden, compara el coste por evento de 2 y 3 resultados y cuánto de
+# ese tiempo es solo pasar el JSON a arrays (pack_outcomes).
+# Uso: python bench/bench_vector_arbs.py [--sports 10] [--events 100] [--books 10,40] [--markets h2h,spreads,totals]
+#                                       [--shade 1.0,0.95]
+import argparse
+import gc
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import arbs  # noqa: E402
+import mock_server  # noqa: E402
+
+def snapshot(n_sports, n_events, n_books, markets, shade=1.0, seed=7):
+    # shade < 1 rebaja todas las cuotas: el mock da muchos más arbitrajes que un mercado real
+    books = tuple(f"book_{b:03d}" for b in range(n_books))
+    sports = [
+        [mock_server.build_event(seed, f"{('soccer' if s % 2 else 'tennis')}_bench_{s}", i, books, markets, 0, 30.0, 0)
+         for i in range(n_events)]
+        for s in range(n_sports)
+    ]
+    for data in sports:
+        for ev in data:
+            for bk in ev["bookmakers"]:
+                for m in bk["markets"]:
+                    for o in m["outcomes"]:
+                        o["price"] = round(o["price"] * shade, 2)
+    return sports
+
+def loop_event_arbs(data, sport_title, require_diff_books=True):
+    # Referencia: un evento y un mercado cada vez
+    out = []
+    for ev in data:
+        bks = ev.get("bookmakers", [])
+        found = []
+        order = arbs.event_order(ev)
+        for market in arbs.event_markets(ev):
+            found.extend(arbs.best_two_outcome_arbs(bks, require_diff_books, market, order))
+            found.extend(arbs.best_outcome_arbs(bks, require_diff_books, market, order))
+        found.sort(key=lambda d: d["edge"], reverse=True)
+        if found:
+            out.append({"event_id": ev.get("id"), "match": arbs.event_title(ev, sport_title),
+                        "start_time": ev.get("commence_time"), "arbs": found})
+    return out
+
+def timed(fn, sports, repeat=3):
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        gc.collect()
+        t0 = time.perf_counter()
+        out = [fn(data, "bench") for data in sports]
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+def pack_only(data, _title):
+    # Solo el paso JSON -> arrays de la detección por lotes
+    return arbs.pack_outcomes(data)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sports", type=int, default=10)
+    parser.add_argument("--events", type=int, default=100)
+    parser.add_argument("--books", default="10,40")
+    parser.add_argument("--markets", default="h2h,spreads,totals")
+    parser.add_argument("--shade", default="1.0,0.95")
+    args = parser.parse_args(argv)
+    markets = tuple(args.markets.split(","))
+    for shade in (float(x) for x in args.shade.split(",")):
+        for n in (int(b) for b in args.books.split(",")):
+            sports = snapshot(args.sports, args.events, n, markets, shade)
+            gc.collect()
+            gc.freeze()  # el snapshot no es basura: que el GC no lo recorra en cada medición
+            t_loop, ref = timed(loop_event_arbs, sports)
+            t_vec, out = timed(arbs.event_arbs, sports)
+            assert out == ref, f"resultados distintos con {n} casas"
+            t_pack, _ = timed(pack_only, sports)
+            t_two, _ = timed(arbs.event_arbs, sports[0::2])
+            t_three, _ = timed(arbs.event_arbs, sports[1::2])
+            gc.unfreeze()
+            n_arbs = sum(len(ev["arbs"]) for data in out for ev in data)
+            per_event = 1e6 / (args.events * max(len(sports) // 2, 1))
+            print(f"cuotas x{shade:.2f} | {args.sports} deportes x {args.events} eventos x {n:3d} casas"
+                  f" | bucle {t_loop * 1000:7.1f} ms | por lotes {t_vec * 1000:7.1f} ms (x{t_loop / t_vec:4.2f},"
+                  f" de ellos JSON -> arrays {t_pack * 1000:7.1f} ms) | por evento: 2 resultados"
+                  f" {t_two * per_event:5.0f} us, 3 resultados {t_three * per_event:5.0f} us | arbitrajes {n_arbs}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# book_coverage.py
+# Cobertura de casas de apuestas: la forma más barata de traer solo las casas en las que apostamos.
+# The Odds API cobra por región (regions=uk,eu → 2 × mercados) o, con el parámetro bookmakers,
+# por cada grupo de hasta 10 casas (bookmakers=a,b,c → 1 × mercados).
+from itertools import combinations
+from math import ceil
+
+# Claves de casa por región según la documentación de The Odds API (una casa puede estar en varias)
+BOOKMAKER_REGIONS = {
+    "uk": ["betfair_ex_uk", "betfair_sb_uk", "betvictor", "betway", "boylesports", "casumo", "coral",
+           "grosvenor", "ladbrokes_uk", "leovegas", "livescorebet", "matchbook", "mrgreen", "paddypower",
+           "skybet", "sport888", "unibet_uk", "virginbet", "williamhill"],
+    "eu": ["betanysports", "betclic", "betfair_ex_eu", "betonlineag", "betsson", "coolbet", "everygame",
+           "gtbets", "marathonbet", "matchbook", "mybookieag", "nordicbet", "onexbet", "pinnacle", "sport888",
+           "suprabets", "tipico_de", "unibet_eu", "unibet_fr", "unibet_it", "unibet_nl", "williamhill",
+           "winamax_de", "winamax_fr"],
+    "us": ["ballybet", "betanysports", "betmgm", "betonlineag", "betparx", "betrivers", "betus", "bovada",
+           "draftkings", "espnbet", "fanduel", "fliff", "hardrockbet", "lowvig", "mybookieag", "williamhill_us",
+           "windcreek"],
+    "au": ["betfair_ex_au", "betr_au", "betright", "boombet", "ladbrokes_au", "neds", "playup", "pointsbetau",
+           "sportsbet", "tab", "tabtouch", "topsport", "unibet"],
+}
+BOOKS_PER_CREDIT = 10
+
+def all_bookmakers():
+    return sorted({b for books in BOOKMAKER_REGIONS.values() for b in books})
+
+def regions_of(book):
+    return [r for r, books in BOOKMAKER_REGIONS.items() if book in books]
+
+def minimal_regions(books):
+    # Menor conjunto de regiones que cubre todas las casas (2^4 combinaciones: fuerza bruta)
+    books = set(books)
+    regions = list(BOOKMAKER_REGIONS)
+    for size in range(1, len(regions) + 1):
+        for combo in combinations(regions, size):
+            covered = set().union(*(BOOKMAKER_REGIONS[r] for r in combo))
+            if books <= covered:
+                return list(combo)
+    return None  # alguna casa no está en el catálogo: solo se puede pedir por bookmakers=
+
+def optimize(books, markets=("h2h",)):
+    # -> {"mode": "regions"|"bookmakers", "regions", "bookmakers", "cost", "alternatives"}
+    books = sorted(set(books))
+    n_markets = max(len(markets), 1)
+    options = []
+    regions = minimal_regions(books)
+    if regions:
+        options.append({"mode": "regions", "regions": regions, "bookmakers": None,
+                        "cost": len(regions) * n_markets})
+    options.append({"mode": "bookmakers", "regions": [], "bookmakers": books,
+                    "cost": ceil(len(books) / BOOKS_PER_CREDIT) * n_markets})
+    # A igual coste se prefieren regiones: traen casas extra gratis para comparar precios
+    options.sort(key=lambda o: (o["cost"], o["mode"] != "regions"))
+    best = dict(options[0])
+    best["alternatives"] = options[1:]
+    return best
+
+def filter_bookmakers(data, allowed):
+    # Deja en cada evento solo las casas permitidas (las regiones traen más de las que usamos)
+    if not allowed:
+        return data
+    allowed = set(allowed)
+
+    def keep(ev):
+        ev = dict(ev)
+        ev["bookmakers"] = [bk for bk in ev.get("bookmakers", []) if bk.get("key") in allowed]
+        return ev
+    if isinstance(data, list):
+        return [keep(ev) for ev in data]
+    if data is None or isinstance(data, dict):
+        return []
+    return (keep(ev) for ev in data)  # flujo de eventos (odds_client.iter_odds)
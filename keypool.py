@@ -0,0 +1,130 @@
+# keypool.py
+# Varias API keys de The Odds API repartidas según la cuota que le queda a cada una.
+import threading
+import time
+
+import requests
+
+import scheduler
+
+class QuotaExhaustedError(requests.RequestException):
+    pass
+
+def _to_float(v):
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return None
+
+class KeyPool:
+    # Cada petición usa la key con más créditos restantes (descontando las que ya tiene en vuelo);
+    # las agotadas se apartan hasta el reinicio de cuota
+    def __init__(self, keys, reset_at=None, clock=time.time):
+        self.keys = list(dict.fromkeys(k.strip() for k in keys if k and k.strip()))
+        if not self.keys:
+            raise ValueError("KeyPool necesita al menos una API key")
+        self.reset_at = reset_at       # datetime; por defecto el 1 del mes siguiente
+        self.clock = clock
+        self._remaining = {}           # key -> último x-requests-remaining
+        self._used = {}                # key -> último x-requests-used
+        self._cost = {}                # key -> último x-requests-last
+        self._inflight = {k: 0 for k in self.keys}
+        self._calls = {k: 0 for k in self.keys}
+        self._exhausted = {}           # key -> timestamp hasta el que no se usa
+        self._turn = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _reset_ts(self):
+        return (self.reset_at or scheduler.next_month_reset()).timestamp()
+
+    def _revive(self, now):
+        for key in [k for k, until in self._exhausted.items() if now >= until]:
+            del self._exhausted[key]
+            self._remaining.pop(key, None)
+
+    def acquire(self, exclude=()):
+        with self._lock:
+            self._revive(self.clock())
+            live = [k for k in self.keys if k not in self._exhausted and k not in exclude]
+            if not live:
+                raise QuotaExhaustedError("Todas las API keys han agotado su cuota hasta el reinicio")
+            # Rotación para desempatar: keys sin datos o iguales se turnan
+            self._turn = (self._turn + 1) % len(self.keys)
+            live = live[self._turn % len(live):] + live[:self._turn % len(live)]
+
+            def score(k):
+                remaining = self._remaining.get(k)
+                if remaining is None:
+                    return float("inf"), -self._inflight[k]
+                return remaining - self._inflight[k] * self._cost.get(k, 1.0), -self._inflight[k]
+            key = max(live, key=score)
+            self._inflight[key] += 1
+            self._calls[key] += 1
+            return key
+
+    def release(self, key, response=None):
+        with self._lock:
+            self._inflight[key] -= 1
+            if response is None:
+                return
+            remaining = _to_float(response.headers.get("x-requests-remaining"))
+            if remaining is not None:
+                self._remaining[key] = remaining
+            used = _to_float(response.headers.get("x-requests-used"))
+            if used is not None:
+                self._used[key] = used
+            last = _to_float(response.headers.get("x-requests-last"))
+            if last is not None and last > 0:
+                self._cost[key] = last
+            # 401 = key sin créditos (o inválida): fuera hasta el reinicio
+            if response.status_code == 401 or (remaining is not None and remaining <= 0):
+                self._exhausted[key] = self._reset_ts()
+
+    def call(self, send):
+        # send(key) hace la petición; un 401 no gasta cuota, así que se prueba con la siguiente key
+        tried = set()
+        while True:
+            try:
+                key = self.acquire(exclude=tried)
+            except QuotaExhaustedError:
+                if tried:
+                    return response
+                raise
+            response = None
+            try:
+                response = send(key)
+            finally:
+                self.release(key, response)
+            if response.status_code != 401:
+                response.pool_quota = self.quota()
+                return response
+            tried.add(key)
+
+    def quota(self):
+        # Saldo conjunto para el planificador: solo las keys vivas de las que hay cabeceras
+        with self._lock:
+            live = [k for k in self.keys if k not in self._exhausted]
+            remaining = [self._remaining[k] for k in live if k in self._remaining]
+            used = list(self._used.values())
+        return {
+            "x-requests-remaining": str(sum(remaining)) if remaining else None,
+            "x-requests-used": str(sum(used)) if used else None,
+        }
+
+    def stats(self):
+        with self._lock:
+            now = self.clock()
+            return [
+                {
+                    "key": f"…{k[-4:]}",
+                    "remaining": self._remaining.get(k),
+                    "used": self._used.get(k),
+                    "calls": self._calls[k],
+                    "in_flight": self._inflight[k],
+                    "exhausted": k in self._exhausted and now < self._exhausted[k],
+                }
+                for k in self.keys
+            ]
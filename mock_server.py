@@ -0,0 +1,331 @@
+# mock_server.py
+# Servidor local que imita /v4/sports, /v4/sports/{sport}/events, /v4/sports/{sport}/odds y
+# /v4/sports/{sport}/events/{event_id}/odds de The Odds API para pruebas
+# de carga y latencia sin red. Genera eventos y casas sintéticos a la escala que se pida,
+# emite cabeceras x-requests-* realistas e inyecta latencia, 429 y 5xx bajo demanda.
+#
+#   python mock_server.py --port 8080 --events 40 --books 30 --latency-ms 150 --rate-429 0.05
+#   ODDS_API_BASE_URL=http://127.0.0.1:8080/v4 streamlit run app.py
+#
+# La configuración se puede cambiar en caliente: GET /_mock/config?latency_ms=500&rate_5xx=0.2
+import argparse
+import gzip
+import json
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+BOOKS_BY_REGION = {
+    "uk": ["williamhill", "betfair_ex_uk", "skybet", "paddypower", "ladbrokes_uk", "coral", "betvictor", "boylesports", "unibet_uk", "virginbet"],
+    "eu": ["pinnacle", "unibet_eu", "betsson", "nordicbet", "onexbet", "sport888", "marathonbet", "betclic", "matchbook", "tipico_de"],
+    "us": ["draftkings", "fanduel", "betmgm", "caesars", "pointsbetus", "betrivers", "bovada", "mybookieag", "betonlineag", "lowvig"],
+    "au": ["sportsbet", "tab", "ladbrokes_au", "neds", "unibet", "betfair_ex_au", "pointsbetau", "playup", "topsport", "betr_au"],
+}
+SPORT_FAMILIES = [
+    ("tennis_atp", "ATP", "Tennis"), ("tennis_wta", "WTA", "Tennis"), ("basketball_nba", "NBA", "Basketball"),
+    ("mma_mixed_martial_arts", "MMA", "Mixed Martial Arts"), ("icehockey_nhl", "NHL", "Ice Hockey"),
+    ("soccer_epl", "EPL", "Soccer"), ("soccer_spain_la_liga", "La Liga", "Soccer"),
+]
+THREE_WAY_PREFIXES = ("soccer_",)
+
+class MockConfig:
+    def __init__(self, sports=12, events=20, books=40, seed=7, latency_ms=0.0, jitter_ms=0.0,
+                 rate_429=0.0, rate_5xx=0.0, retry_after=2, quota=500, drift_seconds=30.0, gzip_min=1024):
+        self.sports = sports            # deportes sintéticos en /sports
+        self.events = events            # eventos por deporte
+        self.books = books              # casas como máximo por evento (repartidas entre regiones)
+        self.seed = seed
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_429 = rate_429
+        self.rate_5xx = rate_5xx
+        self.retry_after = retry_after
+        self.quota = quota              # créditos al arrancar
+        self.drift_seconds = drift_seconds  # cada casa mueve sus precios con este periodo
+        self.gzip_min = gzip_min
+
+    def update(self, params):
+        for k, v in params.items():
+            if hasattr(self, k):
+                setattr(self, k, type(getattr(self, k))(v))
+        # Las dimensiones del payload cambian: lo generado antes ya no vale
+        build_event.cache_clear()
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Generación de datos sintéticos
+# ──────────────────────────────────────────────────────────────────────────────
+def sport_list(cfg):
+    out = []
+    for i in range(cfg.sports):
+        prefix, title, group = SPORT_FAMILIES[i % len(SPORT_FAMILIES)]
+        n = i // len(SPORT_FAMILIES)
+        out.append({
+            "key": f"{prefix}_mock_{n}" if n else f"{prefix}_mock",
+            "group": group,
+            "title": f"{title} Mock {n}" if n else f"{title} Mock",
+            "description": f"Synthetic {group}",
+            "active": True,
+            "has_outrights": False,
+        })
+    return out
+
+def books_for(regions, n_books):
+    per_region = max(1, n_books // len(BOOKS_BY_REGION))
+    out = []
+    for region in regions:
+        names = BOOKS_BY_REGION.get(region, [])
+        for j in range(per_region):
+            base = names[j % len(names)] if names else f"{region}book"
+            out.append(base if j < len(names) else f"{base}_{j // len(names)}")
+    return out
+
+def _iso(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def _market(rnd, key, names, fair, margin):
+    if key == "h2h":
+        return [{"name": n, "price": round(max(1.01, 1.0 / (p * margin)), 2)} for n, p in zip(names, fair)]
+    if key == "spreads":
+        line = round(rnd.uniform(1.5, 5.5) * 2) / 2
+        price = lambda: round(rnd.uniform(1.80, 2.05) / margin ** 0.5, 2)
+        return [{"name": names[0], "price": price(), "point": -line},
+                {"name": names[1], "price": price(), "point": line}]
+    if key == "totals":
+        line = round(rnd.uniform(20.5, 24.5) * 2) / 2
+        price = lambda: round(rnd.uniform(1.80, 2.05) / margin ** 0.5, 2)
+        return [{"name": "Over", "price": price(), "point": line},
+                {"name": "Under", "price": price(), "point": line}]
+    return []
+
+def in_commence_window(events, q):
+    # commenceTimeFrom / commenceTimeTo como en la API real (ISO 8601; comparación de texto)
+    lo, hi = q.get("commenceTimeFrom"), q.get("commenceTimeTo")
+    return [ev for ev in events
+            if (not lo or ev["commence_time"] >= lo) and (not hi or ev["commence_time"] <= hi)]
+
+@lru_cache(maxsize=4096)
+def build_event(seed, sport_key, idx, books, markets, bucket, drift_seconds, origin):
+    # bucket es el instante discretizado: cada casa cambia los precios de cada evento en su propia fase
+    rnd = random.Random(f"{seed}:{sport_key}:{idx}")
+    three_way = sport_key.startswith(THREE_WAY_PREFIXES)
+    home, away = f"Player {idx * 2 + 1}", f"Player {idx * 2 + 2}"
+    names = [home, away, "Draw"] if three_way else [home, away]
+    commence = origin + 1800 + idx * 5400 + rnd.randint(0, 3600)
+    p = rnd.uniform(0.2, 0.8)
+    fair = [p * 0.75, (1 - p) * 0.75, 0.25] if three_way else [p, 1 - p]
+    bookmakers = []
+    for b, book in enumerate(books):
+        phase = (b * 7919 + idx * 104729) % max(int(drift_seconds), 1)
+        version = int((bucket + phase) // max(drift_seconds, 1e-9))
+        brnd = random.Random(f"{seed}:{sport_key}:{idx}:{book}:{version}")
+        margin = 1.0 + brnd.uniform(0.02, 0.07)
+        # De vez en cuando una casa se queda descolgada del mercado: de ahí salen los arbitrajes
+        spread = 0.12 if brnd.random() < 0.05 else 0.03
+        noisy = [max(0.02, f * brnd.uniform(1 - spread, 1 + spread)) for f in fair]
+        updated = _iso(origin + version * drift_seconds - phase)
+        mkts = []
+        for m in markets:
+            outs = _market(brnd, m, names, noisy, margin)
+            if b % 3 == 1:
+                outs = outs[::-1]  # como en la API real, no todas las casas listan igual a los participantes
+            if outs:
+                mkts.append({"key": m, "last_update": updated, "outcomes": outs})
+        bookmakers.append({"key": book, "title": book.replace("_", " ").title(), "last_update": updated, "markets": mkts})
+    return {
+        "id": f"{sport_key}-{idx:05d}",
+        "sport_key": sport_key,
+        "sport_title": sport_key,
+        "commence_time": _iso(commence),
+        "home_team": home,
+        "away_team": away,
+        "bookmakers": bookmakers,
+    }
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Servidor HTTP
+# ──────────────────────────────────────────────────────────────────────────────
+class MockOddsAPI(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, cfg):
+        super().__init__(address, MockHandler)
+        self.cfg = cfg
+        self.origin = time.time()
+        self.used = 0
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v4"
+
+    def charge(self, cost):
+        with self.lock:
+            self.calls += 1
+            if self.used + cost > self.cfg.quota:
+                return None
+            self.used += cost
+            return self.cfg.quota - self.used, self.used
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def send_json(self, status, body, headers=None):
+        data = json.dumps(body, separators=(",", ":")).encode()
+        use_gzip = "gzip" in self.headers.get("Accept-Encoding", "") and len(data) >= self.server.cfg.gzip_min
+        if use_gzip:
+            data = gzip.compress(data, compresslevel=5)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        if use_gzip:
+            self.send_header("Content-Encoding", "gzip")
+        for k, v in (headers or {}).items():
+            self.send_header(k, str(v))
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def quota_headers(self, cost):
+        charged = self.server.charge(cost)
+        if charged is None:
+            return None
+        remaining, used = charged
+        return {"x-requests-remaining": remaining, "x-requests-used": used, "x-requests-last": cost}
+
+    def inject_faults(self):
+        cfg = self.server.cfg
+        delay = cfg.latency_ms + random.uniform(0, cfg.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+        roll = random.random()
+        if roll < cfg.rate_429:
+            self.send_json(429, {"message": "Too many requests", "error_code": "EXCEEDED_FREQ_LIMIT"},
+                           {"Retry-After": cfg.retry_after})
+            return True
+        if roll < cfg.rate_429 + cfg.rate_5xx:
+            self.send_json(random.choice([500, 502, 503]), {"message": "Upstream error"})
+            return True
+        return False
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        q = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+        path = parts.path.rstrip("/").split("/")
+        if path[1:3] == ["_mock", "config"]:
+            self.server.cfg.update({k: v for k, v in q.items()})
+            return self.send_json(200, dict(vars(self.server.cfg), used=self.server.used, calls=self.server.calls))
+        if path[1:2] != ["v4"] or len(path) < 3 or path[2] != "sports":
+            return self.send_json(404, {"message": "Unknown endpoint"})
+        if not q.get("apiKey"):
+            return self.send_json(401, {"message": "API key is missing", "error_code": "MISSING_KEY"})
+        if self.inject_faults():
+            return None
+        if len(path) == 3:
+            return self.handle_sports()
+        if len(path) == 7 and path[4] == "events" and path[6] == "odds":
+            return self.handle_odds(path[3], q, event_id=path[5])
+        if len(path) == 5 and path[4] == "events":
+            return self.handle_events(path[3], q)
+        if len(path) == 5 and path[4] == "odds":
+            return self.handle_odds(path[3], q)
+        return self.send_json(404, {"message": "Unknown endpoint"})
+
+    def handle_sports(self):
+        headers = self.quota_headers(0)
+        return self.send_json(200, sport_list(self.server.cfg), headers)
+
+    def handle_events(self, sport_key, q):
+        cfg = self.server.cfg
+        if sport_key not in {s["key"] for s in sport_list(cfg)}:
+            return self.send_json(404, {"message": "Unknown sport", "error_code": "UNKNOWN_SPORT"})
+        headers = self.quota_headers(0)
+        origin = int(self.server.origin)
+        events = []
+        for i in range(cfg.events):
+            ev = build_event(cfg.seed, sport_key, i, (), (), 0, cfg.drift_seconds, origin)
+            events.append({k: v for k, v in ev.items() if k != "bookmakers"})
+        return self.send_json(200, in_commence_window(events, q), headers)
+
+    def handle_odds(self, sport_key, q, event_id=None):
+        cfg = self.server.cfg
+        if sport_key not in {s["key"] for s in sport_list(cfg)}:
+            return self.send_json(404, {"message": "Unknown sport", "error_code": "UNKNOWN_SPORT"})
+        markets = tuple(m for m in q.get("markets", "h2h").split(",") if m) or ("h2h",)
+        wanted = tuple(sorted({b for b in q.get("bookmakers", "").split(",") if b}))
+        if wanted:
+            # bookmakers= se cobra por cada grupo de 10 casas, como la API real
+            units = -(-len(wanted) // 10)
+        else:
+            regions = tuple(sorted({r for r in q.get("regions", "").split(",") if r in BOOKS_BY_REGION}))
+            if not regions:
+                return self.send_json(422, {"message": "Invalid regions", "error_code": "INVALID_REGION"})
+            units = len(regions)
+        headers = self.quota_headers(units * len(markets))
+        if headers is None:
+            return self.send_json(401, {"message": "Usage quota has been reached", "error_code": "OUT_OF_USAGE_CREDITS"})
+        books = wanted or tuple(books_for(regions, cfg.books))
+        # Discretizado a 1/4 del periodo de deriva para que la caché de eventos sirva entre peticiones
+        step = max(cfg.drift_seconds / 4.0, 1.0)
+        bucket = int((time.time() - self.server.origin) // step * step)
+        if event_id is not None:
+            try:
+                idx = int(event_id.rsplit("-", 1)[1])
+            except (IndexError, ValueError):
+                idx = -1
+            if not 0 <= idx < cfg.events:
+                return self.send_json(404, {"message": "Event not found", "error_code": "EVENT_NOT_FOUND"})
+            event = build_event(cfg.seed, sport_key, idx, books, markets, bucket, cfg.drift_seconds, int(self.server.origin))
+            return self.send_json(200, event, headers)
+        events = [
+            build_event(cfg.seed, sport_key, i, books, markets, bucket, cfg.drift_seconds, int(self.server.origin))
+            for i in range(cfg.events)
+        ]
+        return self.send_json(200, in_commence_window(events, q), headers)
+
+def serve(cfg=None, host="127.0.0.1", port=0, background=True):
+    server = MockOddsAPI((host, port), cfg or MockConfig())
+    if background:
+        threading.Thread(target=server.serve_forever, name="mock-odds-api", daemon=True).start()
+    return server
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mock local de The Odds API v4")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--sports", type=int, default=12)
+    parser.add_argument("--events", type=int, default=20, help="Eventos por deporte")
+    parser.add_argument("--books", type=int, default=40, help="Casas por evento (repartidas entre regiones)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Fracción de respuestas 429")
+    parser.add_argument("--rate-5xx", type=float, default=0.0, help="Fracción de respuestas 5xx")
+    parser.add_argument("--retry-after", type=int, default=2)
+    parser.add_argument("--quota", type=int, default=500)
+    parser.add_argument("--drift-seconds", type=float, default=30.0)
+    args = parser.parse_args(argv)
+    cfg = MockConfig(
+        sports=args.sports, events=args.events, books=args.books, seed=args.seed,
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, rate_429=args.rate_429, rate_5xx=args.rate_5xx,
+        retry_after=args.retry_after, quota=args.quota, drift_seconds=args.drift_seconds,
+    )
+    server = serve(cfg, args.host, args.port, background=False)
+    print(f"Mock Odds API en {server.base_url} (Ctrl+C para parar)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+# odds_cache.py
+# Caché en memoria TTL + LRU con tamaño máximo y claves canónicas para las respuestas de la API.
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import CancelledError
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_AGE = 6 * 3600  # nada sobrevive más que el intervalo máximo del planificador
+DEFAULT_DB_PATH = os.getenv("ODDS_CACHE_DB", os.path.join(".cache", "odds.sqlite3"))
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Claves canónicas
+# ──────────────────────────────────────────────────────────────────────────────
+def canonical_list(values, default=()):
+    # ["eu", "uk"], ["uk", "eu"] y "uk,eu" son la misma petición
+    if isinstance(values, str):
+        values = values.split(",")
+    out = sorted({v.strip().lower() for v in (values or ()) if v and v.strip()})
+    return tuple(out) if out else tuple(default)
+
+def sports_key():
+    return ("sports",)
+
+def events_key(sport_key):
+    return ("events", sport_key)
+
+def odds_key(sport_key, regions, markets=("h2h",), bookmakers=None, window_hours=None):
+    # bookmakers= sustituye a regions=. La ventana entra como horas y no como commenceTimeTo:
+    # la hora absoluta cambia cada hora y con ella la clave, sin copia que servir al rotar
+    if bookmakers:
+        key = ("odds", sport_key, (), canonical_list(markets, ("h2h",)), canonical_list(bookmakers))
+    else:
+        key = ("odds", sport_key, canonical_list(regions, ("eu", "uk")), canonical_list(markets, ("h2h",)))
+    return key + (float(window_hours),) if window_hours else key
+
+def event_odds_key(sport_key, event_id, regions, markets=("h2h",), bookmakers=None):
+    return ("event_odds",) + odds_key(sport_key, regions, markets, bookmakers)[1:] + (event_id,)
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Almacén en disco (SQLite en modo WAL), compartido por procesos y reinicios
+# ──────────────────────────────────────────────────────────────────────────────
+def connect(path):
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=5.0, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=5000")
+    return conn
+
+class SQLiteStore:
+    def __init__(self, path=DEFAULT_DB_PATH, max_age=DEFAULT_MAX_AGE):
+        self.path = path
+        self.max_age = max_age
+        self._local = threading.local()  # una conexión por hilo
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " endpoint TEXT NOT NULL,"
+            " sport_key TEXT,"
+            " regions TEXT,"
+            " markets TEXT,"
+            " fetched_at REAL NOT NULL,"
+            " body TEXT NOT NULL)"
+        )
+        self._conn().execute("CREATE INDEX IF NOT EXISTS responses_fetched_at ON responses (fetched_at)")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = connect(self.path)
+        return conn
+
+    @staticmethod
+    def _row_key(key):
+        return json.dumps(key, separators=(",", ":"))
+
+    def get(self, key):
+        # (value, fetched_at) de la última respuesta guardada, sin mirar su edad
+        row = self._conn().execute(
+            "SELECT body, fetched_at FROM responses WHERE key = ?", (self._row_key(key),)
+        ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def put(self, key, value, fetched_at):
+        endpoint, sport_key, regions, markets = (tuple(key) + (None,) * 4)[:4]
+        self._conn().execute(
+            "INSERT OR REPLACE INTO responses (key, endpoint, sport_key, regions, markets, fetched_at, body)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                self._row_key(key), endpoint, sport_key,
+                ",".join(regions) if regions else None,
+                ",".join(markets) if markets else None,
+                fetched_at, json.dumps(value, separators=(",", ":")),
+            ),
+        )
+        # Con claves por evento y por ventana la tabla no dejaría de crecer: fuera lo que ya no
+        # serviría ni como copia caducada
+        self._conn().execute("DELETE FROM responses WHERE fetched_at < ?", (fetched_at - self.max_age,))
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Single-flight: una sola descarga en curso por clave
+# ──────────────────────────────────────────────────────────────────────────────
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.entry = None
+        self.error = None
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Caché
+# ──────────────────────────────────────────────────────────────────────────────
+class TTLCache:
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_age=DEFAULT_MAX_AGE, clock=time.time, store=None):
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.clock = clock
+        self.store = store          # SQLiteStore opcional detrás de la memoria
+        self._data = OrderedDict()  # key -> (value, fetched_at)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.offline_served = 0
+        self.stale_served = 0
+        self.refresh_errors = 0
+        self.coalesced = 0          # llamadas a la API evitadas por esperar a otra idéntica
+        self._inflight = {}         # key -> _Flight de la descarga en curso
+
+    def get(self, key, ttl):
+        # Devuelve (value, fetched_at) si la entrada tiene menos de ttl segundos, si no None
+        now = self.clock()
+        ttl = min(ttl, self.max_age)
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and now - entry[1] < ttl:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry
+        # Otro proceso (u otra ejecución) puede haberla descargado hace segundos
+        if self.store is not None:
+            entry = self.store.get(key)
+            if entry is not None and now - entry[1] < ttl:
+                with self._lock:
+                    self.disk_hits += 1
+                    self._insert(key, entry)
+                return entry
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, value, fetched_at=None):
+        fetched_at = self.clock() if fetched_at is None else fetched_at
+        with self._lock:
+            self._insert(key, (value, fetched_at))
+        if self.store is not None:
+            self.store.put(key, value, fetched_at)
+        return value, fetched_at
+
+    def get_or_fetch(self, key, ttl, fetch, offline_errors=(), max_stale=None):
+        # offline_errors: excepciones de red ante las que se sirve la última copia guardada.
+        # max_stale: si la copia lleva caducada menos de max_stale segundos se devuelve ya
+        # (stale-while-revalidate) y se refresca en un hilo aparte; si no, se bloquea.
+        entry = self.get(key, ttl)
+        if entry is not None:
+            return entry
+        if max_stale:
+            entry = self.peek(key)
+            if entry is not None and self.clock() - entry[1] < ttl + max_stale:
+                with self._lock:
+                    self.stale_served += 1
+                self.revalidate(key, fetch)
+                return entry
+        try:
+            return self._fetch_shared(key, fetch)
+        except offline_errors:
+            entry = self.peek(key)
+            if entry is None:
+                raise
+            with self._lock:
+                self.offline_served += 1
+            return entry
+
+    def _join(self, key):
+        # (flight, leader): el primero en llegar descarga, el resto espera su resultado
+        with self._lock:
+            flight = self._inflight.get(key)
+            if flight is not None:
+                return flight, False
+            flight = self._inflight[key] = _Flight()
+            return flight, True
+
+    def _lead(self, key, flight, fetch):
+        try:
+            flight.entry = self.put(key, fetch())
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.done.set()
+        return flight.entry
+
+    def _fetch_shared(self, key, fetch):
+        flight, leader = self._join(key)
+        if leader:
+            return self._lead(key, flight, fetch)
+        with self._lock:
+            self.coalesced += 1
+        flight.done.wait()
+        if isinstance(flight.error, CancelledError):
+            # Se canceló quien descargaba, no esta petición: la hace ella
+            return self._fetch_shared(key, fetch)
+        if flight.error is not None:
+            raise flight.error
+        return flight.entry
+
+    def revalidate(self, key, fetch):
+        # Lanza la descarga en segundo plano salvo que ya haya una en curso para la clave
+        flight, leader = self._join(key)
+        if not leader:
+            return
+
+        def run():
+            try:
+                self._lead(key, flight, fetch)
+            except Exception:
+                with self._lock:
+                    self.refresh_errors += 1
+
+        threading.Thread(target=run, name=f"revalidate-{key[0]}", daemon=True).start()
+
+    def is_refreshing(self, key):
+        with self._lock:
+            return key in self._inflight
+
+    def _insert(self, key, entry):
+        self._data[key] = entry
+        self._data.move_to_end(key)
+        self._purge(self.clock())
+
+    def peek(self, key):
+        # Última entrada guardada aunque esté caducada, sin tocar contadores ni orden LRU
+        with self._lock:
+            entry = self._data.get(key)
+        if self.store is not None:
+            disk = self.store.get(key)
+            if disk is not None and (entry is None or disk[1] > entry[1]):
+                entry = disk
+        return entry
+
+    def _purge(self, now):
+        for key in [k for k, (_, ts) in self._data.items() if now - ts >= self.max_age]:
+            del self._data[key]
+            self.expirations += 1
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "offline_served": self.offline_served,
+                "stale_served": self.stale_served,
+                "refreshing": len(self._inflight),
+                "coalesced": self.coalesced,
+                "refresh_errors": self.refresh_errors,
+            }
@@ -0,0 +1,215 @@
+# odds_client.py
+# Cliente HTTP de The Odds API, independiente de Streamlit (lo usan app.py, poller.py y los benchmarks).
+import codecs
+import json
+import os
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import keypool
+import replay
+import resilience
+
+try:
+    import orjson  # opcional: decodifica bastante más rápido que json
+except ImportError:
+    orjson = None
+
+# ODDS_API_BASE_URL permite apuntar a mock_server.py u otro proxy local
+BASE_URL = os.getenv("ODDS_API_BASE_URL", "https://api.the-odds-api.com/v4")
+DEFAULT_TIMEOUT = 30
+
+QUOTA_HEADERS = ("x-requests-remaining", "x-requests-used", "x-requests-last")
+STREAM_CHUNK = 64 * 1024
+
+# ──────────────────────────────────────────────────────────────────────────────
+# API key fuera de Streamlit (variable de entorno o .streamlit/secrets.toml)
+# ──────────────────────────────────────────────────────────────────────────────
+def load_api_key(secrets_path=".streamlit/secrets.toml"):
+    keys = load_api_keys(secrets_path)
+    return keys[0] if keys else None
+
+def split_keys(value):
+    # THE_ODDS_API_KEYS admite "k1,k2" o una lista en el toml
+    if isinstance(value, str):
+        value = value.split(",")
+    return [k.strip() for k in (value or []) if k and k.strip()]
+
+def load_api_keys(secrets_path=".streamlit/secrets.toml"):
+    # THE_ODDS_API_KEYS (varias) y THE_ODDS_API_KEY, primero del entorno y si no del toml
+    keys = split_keys(os.getenv("THE_ODDS_API_KEYS")) + split_keys(os.getenv("THE_ODDS_API_KEY"))
+    if keys:
+        return list(dict.fromkeys(keys))
+    try:
+        import tomllib  # Python 3.11+
+        with open(secrets_path, "rb") as f:
+            data = tomllib.load(f)
+            keys = split_keys(data.get("THE_ODDS_API_KEYS")) + split_keys(data.get("THE_ODDS_API_KEY"))
+    except Exception:
+        pass
+    return list(dict.fromkeys(keys))
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Sesión con pool de conexiones keep-alive
+# ──────────────────────────────────────────────────────────────────────────────
+def build_session(pool_maxsize=32, pool_connections=4, capture=True, retries=True):
+    # pool_maxsize >= hilos del escaneo en paralelo, para no abrir y cerrar sockets.
+    # Sin reintentos a nivel de urllib3: un 429 no debe gastar cuota a ciegas.
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=0,
+        pool_block=False,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.pool_maxsize = pool_maxsize  # tope de hilos útiles contra la API
+    session.headers.update({"Accept": "application/json", "Accept-Encoding": "gzip, deflate"})
+    # Grabación / reproducción de respuestas (ODDS_RECORD_DIR, ODDS_REPLAY_DIR, ODDS_REPLAY_SPEED)
+    if capture:
+        replay.configure(session)
+    # Reintentos, backoff y circuit breaker viajan con la sesión (ver _get)
+    session.resilience = resilience.Resilience() if retries else None
+    return session
+
+def _get(session, endpoint, url, params, timeout, stream=False):
+    policy = getattr(session, "resilience", None)
+    pool = params.get("apiKey")
+    if isinstance(pool, keypool.KeyPool):
+        # Cada intento (también los reintentos) elige key: un 429 en una no bloquea a las demás
+        send = lambda: pool.call(
+            lambda key: session.get(url, params=dict(params, apiKey=key), timeout=timeout, stream=stream)
+        )
+    else:
+        send = lambda: session.get(url, params=params, timeout=timeout, stream=stream)
+    if policy is None:
+        return send()
+    return policy.call(endpoint, send, cancel=resilience.current_cancel_token())
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Decodificación JSON: orjson si está instalado y parseo en flujo evento a evento
+# ──────────────────────────────────────────────────────────────────────────────
+def decode_json(content):
+    # Bytes de la respuesta -> objetos Python (la API siempre responde en UTF-8)
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+def iter_json_array(chunks):
+    # Elementos de un array JSON de primer nivel según llegan los trozos de bytes, sin
+    # construir la lista entera: la memoria depende del evento más grande, no del payload
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder("utf-8")()
+    buf, pos, started = "", 0, False
+    for chunk in chunks:
+        buf = buf[pos:] + text.decode(chunk)
+        pos = 0
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos >= len(buf):
+                break
+            if not started:
+                if buf[pos] != "[":
+                    raise ValueError("Se esperaba un array JSON")
+                started, pos = True, pos + 1
+                continue
+            if buf[pos] == "]":
+                return
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                break  # elemento cortado: falta el siguiente trozo
+            if end == len(buf) and buf[end - 1] not in '}]"':
+                break  # número o literal al final del trozo: puede seguir en el siguiente
+            pos = end
+            yield item
+    raise ValueError("Array JSON incompleto")
+
+def quota_headers(response):
+    headers = {h: response.headers.get(h) for h in QUOTA_HEADERS}
+    # Con varias keys el planificador debe ver el saldo conjunto, no el de la key que tocó
+    for h, v in (getattr(response, "pool_quota", None) or {}).items():
+        if v is not None:
+            headers[h] = v
+    return headers
+
+def market_costs(headers, markets):
+    # The Odds API cobra regiones × mercados: x-requests-last se reparte a partes iguales
+    markets = list(markets) or ["h2h"]
+    try:
+        last = float(headers.get("x-requests-last"))
+    except (TypeError, ValueError):
+        return {}
+    return {m: last / len(markets) for m in markets}
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Endpoints
+# ──────────────────────────────────────────────────────────────────────────────
+def get_sports(session, api_key, base_url=BASE_URL, timeout=DEFAULT_TIMEOUT):
+    r = _get(session, "sports", f"{base_url}/sports", {"apiKey": api_key}, timeout)
+    r.raise_for_status()
+    return decode_json(r.content)
+
+def _odds_params(regions, api_key, markets, bookmakers=None, commence_from=None, commence_to=None):
+    params = {
+        "regions": ",".join(regions) if regions else "uk,eu",
+        "markets": ",".join(markets) if markets else "h2h",
+        "oddsFormat": "decimal",
+        "apiKey": api_key
+    }
+    if bookmakers:
+        # bookmakers= sustituye a regions= y se cobra por cada 10 casas
+        del params["regions"]
+        params["bookmakers"] = ",".join(bookmakers)
+    # Ventana de commence_time filtrada en el servidor (formato YYYY-MM-DDTHH:MM:SSZ)
+    if commence_from:
+        params["commenceTimeFrom"] = commence_from
+    if commence_to:
+        params["commenceTimeTo"] = commence_to
+    return params
+
+def get_odds(session, sport_key, regions, api_key, markets=("h2h",), base_url=BASE_URL, timeout=DEFAULT_TIMEOUT,
+             bookmakers=None, commence_from=None, commence_to=None):
+    params = _odds_params(regions, api_key, markets, bookmakers, commence_from, commence_to)
+    r = _get(session, "odds", f"{base_url}/sports/{sport_key}/odds", params, timeout)
+    headers = quota_headers(r)
+    r.raise_for_status()
+    return decode_json(r.content), headers
+
+def iter_odds(session, sport_key, regions, api_key, markets=("h2h",), base_url=BASE_URL, timeout=DEFAULT_TIMEOUT,
+              bookmakers=None, commence_from=None, commence_to=None):
+    # Como get_odds, pero devuelve (generador de eventos, cabeceras) y parsea el cuerpo en flujo
+    params = _odds_params(regions, api_key, markets, bookmakers, commence_from, commence_to)
+    r = _get(session, "odds", f"{base_url}/sports/{sport_key}/odds", params, timeout, stream=True)
+    headers = quota_headers(r)
+    try:
+        r.raise_for_status()
+    except requests.HTTPError:
+        r.close()
+        raise
+
+    def events():
+        with r:
+            yield from iter_json_array(r.iter_content(STREAM_CHUNK))
+    return events(), headers
+
+def get_events(session, sport_key, api_key, base_url=BASE_URL, timeout=DEFAULT_TIMEOUT):
+    # Listado de eventos sin cuotas: no consume créditos de la cuota
+    url = f"{base_url}/sports/{sport_key}/events"
+    r = _get(session, "events", url, {"apiKey": api_key, "dateFormat": "iso"}, timeout)
+    headers = quota_headers(r)
+    r.raise_for_status()
+    return decode_json(r.content), headers
+
+def get_event_odds(session, sport_key, event_id, regions, api_key, markets=("h2h",), base_url=BASE_URL,
+                   timeout=DEFAULT_TIMEOUT, bookmakers=None):
+    # Un solo evento: mismo coste por llamada que el deporte entero pero payload mucho menor
+    params = _odds_params(regions, api_key, markets, bookmakers)
+    url = f"{base_url}/sports/{sport_key}/events/{event_id}/odds"
+    r = _get(session, "event_odds", url, params, timeout)
+    headers = quota_headers(r)
+    r.raise_for_status()
+    return decode_json(r.content), headers
@@ -0,0 +1,352 @@
+# poller.py
+# Proceso que descarga cuotas y detecta arbitrajes en bucle, independiente de la UI.
+# Publica snapshots versionados que app.py solo tiene que leer y pintar.
+#
+#   python poller.py --search tennis --regions uk,eu &
+#   streamlit run app.py
+import argparse
+import logging
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+
+import arbs
+import book_coverage
+import keypool
+import odds_cache
+import odds_client
+import replay
+import scheduler
+import snapshots
+
+log = logging.getLogger("poller")
+
+SPORTS_REFRESH = 3600  # /sports cambia poco y no gasta cuota
+TICK = 5               # resolución del bucle (segundos)
+OFFLINE_ERRORS = (requests.ConnectionError, requests.Timeout)
+
+class Poller:
+    def __init__(self, api_key, regions, markets=("h2h",), bookmakers=None, search="", sport_keys=None,
+                 min_interval=60, workers=8, base_url=odds_client.BASE_URL, db_path=odds_cache.DEFAULT_DB_PATH,
+                 session=None, persist_responses=True, window_hours=None, hot_interval=15, hot_budget=0.0,
+                 hot_max=scheduler.HOT_MAX_EVENTS, stream=False):
+        self.api_key = api_key
+        self.regions = list(odds_cache.canonical_list(regions, ("eu", "uk")))
+        self.markets = list(odds_cache.canonical_list(markets, ("h2h",)))
+        # Con lista de casas se pide lo más barato que las cubre y solo se cruzan esas casas
+        self.allowed_books = sorted(set(bookmakers or []))
+        self.bookmakers = None
+        if self.allowed_books:
+            plan = book_coverage.optimize(self.allowed_books, self.markets)
+            if plan["mode"] == "regions":
+                self.regions = plan["regions"]
+            else:
+                self.bookmakers = plan["bookmakers"]
+            log.info("cobertura: %s (%d créditos por llamada)", plan["mode"], plan["cost"])
+        self.search = search
+        self.sport_keys = sport_keys
+        self.min_interval = min_interval
+        self.workers = workers
+        self.base_url = base_url
+        self.session = session or odds_client.build_session(pool_maxsize=max(workers, 4))
+        store = odds_cache.SQLiteStore(db_path) if persist_responses else None
+        self.cache = odds_cache.TTLCache(store=store)
+        self.scheduler = scheduler.QuotaScheduler()
+        self.gate = scheduler.EventGate()
+        # Eventos calientes (arbitraje reciente o a punto de empezar): si se reserva hot_budget (fracción
+        # del presupuesto) se refrescan uno a uno por /events/{id}/odds, como mucho cada hot_interval.
+        # Es gasto extra: una llamada por evento cuesta lo mismo que la del deporte entero
+        self.hot = scheduler.HotSet(max_events=hot_max)
+        self.hot_interval = hot_interval
+        self.hot_budget = hot_budget
+        self._hot_intervals = {}  # sport_key -> intervalo de sus llamadas por evento en esta vuelta
+        self.window_hours = window_hours
+        # stream: /odds se parsea evento a evento hacia la detección, sin guardar la respuesta
+        self.stream = stream
+        self.store = snapshots.SnapshotStore(db_path)
+        self.sports = {}       # sport_key -> título
+        self.state = {}        # sport_key -> último resultado publicado
+        self.trackers = {}     # sport_key -> arbs.IncrementalArbs: solo se reevalúan los eventos que cambian
+        self._polled_at = {}   # sport_key -> último intento (aunque falle)
+        self._next_start = {}  # sport_key -> commence_time más próximo visto en /events
+        self._sports_at = 0.0
+        self._stop = False
+
+    def stop(self, *_):
+        self._stop = True
+
+    def refresh_sports(self):
+        all_sports = self.cache.get_or_fetch(
+            odds_cache.sports_key(), SPORTS_REFRESH,
+            lambda: odds_client.get_sports(self.session, self.api_key, base_url=self.base_url),
+            offline_errors=OFFLINE_ERRORS,
+        )[0]
+        if self.sport_keys:
+            selected = [s for s in all_sports if s.get("key") in self.sport_keys]
+        else:
+            selected = arbs.filter_sports(all_sports, self.search)
+        self.sports = {s.get("key"): s.get("title") or s.get("key") for s in selected}
+        self._sports_at = time.time()
+        log.info("%d deportes a vigilar", len(self.sports))
+
+    def due(self, now):
+        floors = {k: scheduler.commence_ttl(self._next_start.get(k), self.min_interval, now)
+                  for k in self.sports if k in self._next_start}
+        intervals = self.scheduler.intervals(self.sports, self.min_interval, floors=floors)
+        counts = self.hot.counts(now) if self.hot_budget else {}
+        self._hot_intervals = self.scheduler.hot_intervals(counts, self.hot_budget, self.hot_interval, intervals)
+        if self._hot_intervals:
+            # La reserva solo se descuenta a las descargas completas si hay eventos que la gasten
+            intervals = self.scheduler.intervals(self.sports, self.min_interval, floors=floors,
+                                                 reserve=self.hot_budget)
+        due = [k for k in self.sports if now - self._polled_at.get(k, 0.0) >= intervals[k]]
+        return due, intervals
+
+    def discover(self, sport_key):
+        # Paso gratuito por /events: (fetch, forzar, huella); si falla se piden cuotas igual
+        try:
+            (events, _), _ = self.cache.get_or_fetch(
+                odds_cache.events_key(sport_key), scheduler.EVENTS_TTL,
+                lambda: odds_client.get_events(self.session, sport_key, self.api_key, base_url=self.base_url),
+                offline_errors=OFFLINE_ERRORS,
+            )
+        except Exception as e:
+            log.warning("%s /events: %s", sport_key, e)
+            return True, False, None
+        events = scheduler.events_in_window(events, self.window_hours)
+        self._next_start[sport_key] = scheduler.next_start(events)
+        return self.gate.decide(sport_key, events)
+
+    def fetch_one(self, sport_key, ttl):
+        do_fetch, force, fingerprint = self.discover(sport_key)
+        if not do_fetch:
+            return None
+        commence_to = scheduler.commence_window(self.window_hours)
+        if self.stream:
+            # Sin caché de respuestas: el intervalo del planificador ya limita las llamadas
+            events, headers = odds_client.iter_odds(
+                self.session, sport_key, self.regions, self.api_key, self.markets, base_url=self.base_url,
+                bookmakers=self.bookmakers, commence_to=commence_to,
+            )
+            self.gate.mark_fetched(sport_key, fingerprint)
+            return book_coverage.filter_bookmakers(events, self.allowed_books), headers, time.time()
+        # Si han aparecido partidos nuevos no se espera a que caduque la copia en caché
+        (data, headers), fetched_at = self.cache.get_or_fetch(
+            odds_cache.odds_key(sport_key, self.regions, self.markets, self.bookmakers, self.window_hours),
+            0 if force else ttl,
+            lambda: odds_client.get_odds(self.session, sport_key, self.regions, self.api_key, self.markets,
+                                         base_url=self.base_url, bookmakers=self.bookmakers, commence_to=commence_to),
+            offline_errors=OFFLINE_ERRORS,
+        )
+        self.gate.mark_fetched(sport_key, fingerprint)
+        return book_coverage.filter_bookmakers(data, self.allowed_books), headers, fetched_at
+
+    def scan_one(self, sport_key, ttl):
+        # Descarga y detección en el mismo hilo: en modo flujo los eventos se consumen según llegan
+        result = self.fetch_one(sport_key, ttl)
+        if result is None:
+            return None
+        data, headers, fetched_at = result
+        listing = []
+
+        def tap(events):
+            # id y commence_time de cada evento para el hot set, sin retener el resto
+            for ev in events:
+                listing.append({"id": ev.get("id"), "commence_time": ev.get("commence_time")})
+                yield ev
+        # Sin filtrar por margen ni por casas: eso lo decide cada usuario en la UI
+        source = [] if data is None or isinstance(data, dict) else data
+        tracker = self.tracker(sport_key)
+        events, changes = tracker.update(tap(source))
+        return events, changes, listing, headers, fetched_at
+
+    def tracker(self, sport_key):
+        # Cada deporte lo escanea un solo hilo por vuelta, y los eventos calientes van después
+        tracker = self.trackers.get(sport_key)
+        if tracker is None:
+            tracker = self.trackers[sport_key] = arbs.IncrementalArbs(self.sports[sport_key], require_diff_books=False)
+        return tracker
+
+    def poll_once(self):
+        now = time.time()
+        if not self.sports or now - self._sports_at >= SPORTS_REFRESH:
+            self.refresh_sports()
+        due, intervals = self.due(now)
+        if not due:
+            return None
+        updated = 0
+        for k in due:
+            self._polled_at[k] = now
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(self.scan_one, k, intervals[k]): k for k in due}
+            for fut in as_completed(futures):
+                key = futures[fut]
+                title = self.sports[key]
+                try:
+                    result = fut.result()
+                except Exception as e:
+                    log.warning("%s: %s", key, e)
+                    continue
+                if result is None:
+                    # Sin partidos en la ventana: fuera del snapshot y sin gastar cuota
+                    self.trackers.pop(key, None)
+                    if self.state.pop(key, None) is not None:
+                        updated += 1
+                    continue
+                events, changes, listing, headers, fetched_at = result
+                self.hot.update_from_payload(key, listing, {ev["event_id"] for ev in events})
+                self.scheduler.observe(key, headers, sum(len(ev["arbs"]) for ev in events), token=fetched_at)
+                self.state[key] = {"title": title, "fetched_at": fetched_at, "headers": headers, "events": events,
+                                   "changes": changes}
+                log_changes(key, changes)
+                updated += 1
+        if not updated:
+            return None
+        return self.publish(updated, len(due))
+
+    def fetch_event(self, sport_key, event_id, ttl):
+        (event, headers), fetched_at = self.cache.get_or_fetch(
+            odds_cache.event_odds_key(sport_key, event_id, self.regions, self.markets, self.bookmakers),
+            ttl,
+            lambda: odds_client.get_event_odds(self.session, sport_key, event_id, self.regions, self.api_key,
+                                               self.markets, base_url=self.base_url, bookmakers=self.bookmakers),
+            offline_errors=OFFLINE_ERRORS,
+        )
+        if event:
+            event = book_coverage.filter_bookmakers([event], self.allowed_books)[0]
+        return event, headers, fetched_at
+
+    def merge_event(self, sport_key, event_id, event):
+        # Sustituye (o quita) las filas de un evento dentro del snapshot en memoria
+        state = self.state.get(sport_key)
+        if state is None:
+            return False
+        tracker = self.tracker(sport_key)
+        if event:
+            events, changes = tracker.update([event], complete=False)
+        else:
+            events, changes = tracker.remove(event_id)
+        state["events"] = events
+        self.hot.mark_arb(event_id, any(ev["event_id"] == event_id for ev in events))
+        if not any(changes.values()):
+            return False
+        state["changes"] = changes
+        log_changes(sport_key, changes)
+        return True
+
+    def poll_hot(self):
+        due = self.hot.due(self._hot_intervals)
+        if not due:
+            return None
+        updated = 0
+        started = time.time()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(self.fetch_event, k, e, self._hot_intervals[k]): (k, e) for k, e in due}
+            for fut in as_completed(futures):
+                sport_key, event_id = futures[fut]
+                try:
+                    event, headers, fetched_at = fut.result()
+                except requests.HTTPError as e:
+                    if e.response is not None and e.response.status_code == 404:
+                        event, headers, fetched_at = None, {}, started  # el evento ya no existe: fuera del snapshot
+                    else:
+                        log.warning("%s/%s: %s", sport_key, event_id, e)
+                        continue
+                except Exception as e:
+                    log.warning("%s/%s: %s", sport_key, event_id, e)
+                    continue
+                if fetched_at >= started:
+                    self.scheduler.observe_hot(sport_key, headers)
+                if self.merge_event(sport_key, event_id, event):
+                    updated += 1
+        if not updated:
+            return None
+        return self.publish(updated, len(due), hot=True)
+
+    def publish(self, updated, total, hot=False):
+        version = self.store.publish({"regions": self.regions or ["bookmakers"], "markets": self.markets,
+                                      "sports": self.state})
+        log.info("snapshot v%d: %d/%d %s actualizados", version, updated, total, "eventos calientes" if hot else "deportes")
+        if hot:
+            log.info("llamadas por evento desde el arranque: %d (%g créditos)",
+                     self.scheduler.hot_calls, self.scheduler.hot_credits)
+        else:
+            stats = [t.stats() for t in self.trackers.values()]
+            log.info("detección incremental desde el arranque: %d eventos reevaluados, %d sin cambios en last_update",
+                     sum(t["evaluated"] for t in stats), sum(t["skipped"] for t in stats))
+        policy = getattr(self.session, "resilience", None)
+        if policy is not None and (policy.retries or policy.short_circuits):
+            log.info("reintentos: %s", policy.stats())
+        return version
+
+    def run(self, once=False):
+        while not self._stop:
+            try:
+                self.poll_once()
+                self.poll_hot()
+            except Exception:
+                log.exception("fallo en la vuelta del poller")
+            if once:
+                break
+            time.sleep(TICK)
+
+def log_changes(sport_key, changes):
+    if any(changes.values()):
+        log.info("%s: arbitrajes +%d -%d ~%d", sport_key,
+                 len(changes["added"]), len(changes["removed"]), len(changes["changed"]))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Poller de cuotas y arbitrajes para app.py")
+    parser.add_argument("--regions", default="uk,eu")
+    parser.add_argument("--markets", default="h2h", help="Mercados separados por comas (h2h,spreads,totals)")
+    parser.add_argument("--bookmakers", default="",
+                        help="Casas en las que se apuesta, separadas por comas (sustituye a --regions por la opción más barata)")
+    parser.add_argument("--search", default="", help="Filtro de texto sobre título/clave del deporte")
+    parser.add_argument("--sports", default="", help="Claves de deporte separadas por comas (ignora --search)")
+    parser.add_argument("--min-interval", type=int, default=60, help="Intervalo mínimo de refresco por deporte (s)")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--window-hours", type=float, default=0,
+                        help="Solo deportes con partidos en las próximas N horas (0 = sin límite)")
+    parser.add_argument("--hot-budget", type=float, default=0.0,
+                        help="Fracción del presupuesto de cuota para refrescar eventos calientes uno a uno por "
+                             "/events/{id}/odds, además de su deporte (0 = desactivado, p. ej. 0.2)")
+    parser.add_argument("--hot-interval", type=int, default=15,
+                        help="Refresco más rápido de un evento caliente (s)")
+    parser.add_argument("--hot-max", type=int, default=scheduler.HOT_MAX_EVENTS, help="Máximo de eventos calientes")
+    parser.add_argument("--db", default=odds_cache.DEFAULT_DB_PATH)
+    parser.add_argument("--once", action="store_true", help="Una sola vuelta y salir")
+    parser.add_argument("--stream", action="store_true",
+                        help="Parsear /odds evento a evento (memoria plana con payloads grandes; sin caché de respuestas)")
+    parser.add_argument("--record", default=replay.RECORD_DIR, help="Grabar respuestas crudas en este directorio")
+    parser.add_argument("--replay", default=replay.REPLAY_DIR, help="Reproducir grabaciones de este directorio (sin red)")
+    parser.add_argument("--replay-speed", type=float, default=replay.REPLAY_SPEED,
+                        help="1 = tiempo real, 10 = 10x, 0 = una grabación por petición sin esperar")
+    args = parser.parse_args(argv)
+    if not 0 <= args.hot_budget < 1:
+        parser.error("--hot-budget debe estar entre 0 y 1")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    api_keys = odds_client.load_api_keys() or (["replay"] if args.replay else [])
+    if not api_keys:
+        parser.error("Falta THE_ODDS_API_KEY (variable de entorno o .streamlit/secrets.toml)")
+    # Con varias keys (THE_ODDS_API_KEYS) cada petición usa la que más cuota conserva
+    api_key = keypool.KeyPool(api_keys)
+    session = odds_client.build_session(pool_maxsize=max(args.workers, 4), capture=False)
+    replay.configure(session, record_dir=args.record, replay_dir=args.replay, replay_speed=args.replay_speed)
+    poller = Poller(
+        api_key, args.regions.split(","), markets=args.markets.split(","),
+        bookmakers=[b for b in args.bookmakers.split(",") if b], search=args.search,
+        sport_keys=[k for k in args.sports.split(",") if k] or None,
+        min_interval=args.min_interval, workers=args.workers, db_path=args.db,
+        session=session, persist_responses=not args.replay, window_hours=args.window_hours or None,
+        hot_interval=args.hot_interval, hot_budget=args.hot_budget, hot_max=args.hot_max,
+        stream=args.stream,
+    )
+    signal.signal(signal.SIGTERM, poller.stop)
+    signal.signal(signal.SIGINT, poller.stop)
+    poller.run(once=args.once)
+
+if __name__ == "__main__":
+    main()
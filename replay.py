@@ -0,0 +1,204 @@
+# replay.py
+# Grabación y reproducción de respuestas crudas de The Odds API.
+# - Grabar: un hook de respuesta de la sesión escribe cada /sports y /odds (con cabeceras) a .json.gz.
+# - Reproducir: un adaptador de transporte sirve esas respuestas sin red, a velocidad real o acelerada.
+import bisect
+import codecs
+import glob
+import gzip
+import io
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import parse_qsl, urlsplit
+
+from requests import Response
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+RECORD_DIR = os.getenv("ODDS_RECORD_DIR")
+REPLAY_DIR = os.getenv("ODDS_REPLAY_DIR")
+REPLAY_SPEED = float(os.getenv("ODDS_REPLAY_SPEED", "1"))
+
+SECRET_PARAMS = {"apiKey"}
+
+def request_key(url):
+    # Ruta + parámetros canónicos (sin apiKey): dos peticiones equivalentes comparten grabaciones
+    parts = urlsplit(url)
+    path = parts.path
+    if "/v4/" in path:
+        path = path[path.index("/v4/") + 3:]
+    params = []
+    for k, v in parse_qsl(parts.query):
+        if k in SECRET_PARAMS:
+            continue
+        if "," in v:
+            v = ",".join(sorted(x.strip() for x in v.split(",") if x.strip()))
+        params.append((k, v))
+    return path + "?" + "&".join(f"{k}={v}" for k, v in sorted(params))
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Grabación
+# ──────────────────────────────────────────────────────────────────────────────
+class Recorder:
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._seq = 0
+
+    def hook(self, response, *args, **kwargs):
+        if getattr(response, "from_replay", False):
+            return response
+        if kwargs.get("stream"):
+            # Respuesta en flujo: leer .text aquí cargaría el payload entero antes de iter_content
+            self.record_stream(response)
+        else:
+            self.record(response)
+        return response
+
+    def _path(self, key, recorded_at):
+        with self._lock:
+            self._seq += 1
+            seq = self._seq
+        stamp = datetime.fromtimestamp(recorded_at, timezone.utc).strftime("%Y%m%dT%H%M%S.%f")
+        slug = key.split("?")[0].strip("/").replace("/", "_") or "root"
+        return os.path.join(self.directory, f"{stamp}_{seq:06d}_{slug}.json.gz")
+
+    def _envelope(self, response, key, recorded_at):
+        return {"recorded_at": recorded_at, "key": key, "status": response.status_code, "headers": dict(response.headers)}
+
+    def record(self, response, recorded_at=None):
+        recorded_at = time.time() if recorded_at is None else recorded_at
+        key = request_key(response.url)
+        path = self._path(key, recorded_at)
+        envelope = dict(self._envelope(response, key, recorded_at), body=response.text)
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            json.dump(envelope, f, separators=(",", ":"))
+        return path
+
+    def record_stream(self, response):
+        # Envuelve iter_content: el cuerpo va al fichero según lo consume quien lee, con el mismo
+        # formato que record. Si quien lee para antes del final (el parser en flujo se detiene en
+        # el "]"), el resto se graba sin devolverlo; si la descarga falla no queda grabación
+        recorded_at = time.time()
+        key = request_key(response.url)
+        path = self._path(key, recorded_at)
+        head = json.dumps(self._envelope(response, key, recorded_at), separators=(",", ":"))
+        iter_content = response.iter_content
+
+        def tee(chunk_size=1, decode_unicode=False):
+            text = codecs.getincrementaldecoder("utf-8")(errors="replace")
+            done = False
+            try:
+                with gzip.open(path + ".part", "wt", encoding="utf-8") as f:
+                    f.write(head[:-1] + ',"body":"')
+                    chunks = iter_content(chunk_size, decode_unicode)
+                    try:
+                        for chunk in chunks:
+                            f.write(json.dumps(chunk if isinstance(chunk, str) else text.decode(chunk))[1:-1])
+                            yield chunk
+                    except GeneratorExit:
+                        for chunk in chunks:
+                            f.write(json.dumps(chunk if isinstance(chunk, str) else text.decode(chunk))[1:-1])
+                    f.write(json.dumps(text.decode(b"", final=True))[1:-1] + '"}')
+                done = True
+            finally:
+                if done:
+                    os.replace(path + ".part", path)
+                elif os.path.exists(path + ".part"):
+                    os.remove(path + ".part")
+        response.iter_content = tee
+        return path
+
+def attach_recorder(session, directory):
+    recorder = Recorder(directory)
+    session.hooks["response"].append(recorder.hook)
+    return recorder
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Reproducción
+# ──────────────────────────────────────────────────────────────────────────────
+def load_recordings(directory):
+    by_key = {}
+    for path in sorted(glob.glob(os.path.join(directory, "*.json.gz"))):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            rec = json.load(f)
+        by_key.setdefault(rec["key"], []).append(rec)
+    for recs in by_key.values():
+        recs.sort(key=lambda r: r["recorded_at"])
+    return by_key
+
+class ReplayAdapter(BaseAdapter):
+    # speed=1 reproduce a velocidad real, speed=10 diez veces más rápido y speed=0 sirve
+    # las grabaciones de cada petición una tras otra, sin esperar al reloj.
+    def __init__(self, directory, speed=1.0, clock=time.time):
+        super().__init__()
+        self.recordings = load_recordings(directory)
+        if not self.recordings:
+            raise FileNotFoundError(f"No hay grabaciones .json.gz en {directory}")
+        self.speed = speed
+        self.clock = clock
+        self.origin = min(r[0]["recorded_at"] for r in self.recordings.values())
+        self.started = clock()
+        self._cursor = {}
+        self._times = {k: [r["recorded_at"] for r in recs] for k, recs in self.recordings.items()}
+        self._lock = threading.Lock()
+
+    def virtual_now(self):
+        return self.origin + (self.clock() - self.started) * self.speed
+
+    def pick(self, key):
+        recs = self.recordings.get(key)
+        if not recs:
+            return None
+        if self.speed <= 0:
+            with self._lock:
+                i = self._cursor.get(key, 0)
+                self._cursor[key] = min(i + 1, len(recs) - 1)
+            return recs[i]
+        # La última grabación anterior al instante virtual (o la primera si aún no hay)
+        i = bisect.bisect_right(self._times[key], self.virtual_now()) - 1
+        return recs[max(i, 0)]
+
+    def send(self, request, **kwargs):
+        key = request_key(request.url)
+        rec = self.pick(key)
+        response = Response()
+        response.request = request
+        response.url = request.url
+        response.from_replay = True
+        if rec is None:
+            response.status_code = 404
+            response.reason = "Not Recorded"
+            response.headers = CaseInsensitiveDict({"Content-Type": "application/json"})
+            response.raw = io.BytesIO(json.dumps({"message": f"Sin grabación para {key}"}).encode())
+            return response
+        response.status_code = rec["status"]
+        response.reason = "OK" if rec["status"] < 400 else "Recorded Error"
+        response.headers = CaseInsensitiveDict(rec["headers"])
+        response.headers.pop("Content-Encoding", None)  # el cuerpo se guardó ya descomprimido
+        response.headers.pop("Content-Length", None)
+        response.encoding = "utf-8"
+        # Como cuerpo de transporte y no precargado, para que también se pueda leer en flujo
+        response.raw = io.BytesIO(rec["body"].encode("utf-8"))
+        return response
+
+    def close(self):
+        pass
+
+def attach_replay(session, directory, speed=1.0):
+    adapter = ReplayAdapter(directory, speed=speed)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return adapter
+
+def configure(session, record_dir=RECORD_DIR, replay_dir=REPLAY_DIR, replay_speed=REPLAY_SPEED):
+    # Por defecto desde ODDS_RECORD_DIR / ODDS_REPLAY_DIR / ODDS_REPLAY_SPEED
+    if replay_dir:
+        attach_replay(session, replay_dir, replay_speed)
+    elif record_dir:
+        attach_recorder(session, record_dir)
+    return session
@@ -0,0 +1,206 @@
+# resilience.py
+# Reintentos con backoff exponencial y jitter, Retry-After y circuit breaker por endpoint
+# para las llamadas a The Odds API.
+import random
+import threading
+import time
+from concurrent.futures import CancelledError
+from email.utils import parsedate_to_datetime
+
+import requests
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+RETRY_ERRORS = (requests.ConnectionError, requests.Timeout)
+
+class CircuitOpenError(requests.ConnectionError):
+    # Hereda de ConnectionError: la caché lo trata como "sin conexión" y sirve la última copia
+    pass
+
+class FetchCancelled(CancelledError):
+    # Quien pidió la descarga ya no la espera (p. ej. la UI cambió de deporte): no se reintenta más
+    pass
+
+# Token de cancelación (threading.Event) del trabajo al que sirve cada hilo
+_local = threading.local()
+
+def bind_cancel_token(token):
+    _local.cancel = token
+
+def current_cancel_token():
+    return getattr(_local, "cancel", None)
+
+def retry_after_seconds(response, now=None):
+    value = response.headers.get("Retry-After") if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - (now or time.time()), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Circuit breaker
+# ──────────────────────────────────────────────────────────────────────────────
+class CircuitBreaker:
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == "open":
+                if self.clock() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = "half_open"
+                self._trial = False
+            if self.state == "half_open":
+                if self._trial:
+                    return False  # solo una petición de prueba a la vez
+                self._trial = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._trial = False
+
+    def release(self):
+        # La petición de prueba se abandonó sin resultado: que pueda salir otra
+        with self._lock:
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.state = "open"
+                self.opened_at = self.clock()
+            self._trial = False
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Política de reintentos
+# ──────────────────────────────────────────────────────────────────────────────
+class Resilience:
+    def __init__(self, max_retries=3, base_delay=0.5, max_delay=20.0, quota_floor=10,
+                 failure_threshold=5, reset_timeout=30.0, sleep=time.sleep):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.quota_floor = quota_floor    # con menos créditos que esto no se reintenta
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.sleep = sleep
+        self.remaining = None
+        self.retries = 0
+        self.wait_seconds = 0.0
+        self.giveups = 0
+        self.short_circuits = 0
+        self.floor_blocks = 0
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, endpoint):
+        with self._lock:
+            b = self._breakers.get(endpoint)
+            if b is None:
+                b = self._breakers[endpoint] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return b
+
+    def backoff(self, attempt):
+        # "Full jitter": uniforme entre 0 y el exponencial acotado
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def _note_quota(self, response):
+        # Con un KeyPool cuenta el saldo conjunto de todas las keys
+        headers = getattr(response, "pool_quota", None) or response.headers
+        try:
+            remaining = float(headers.get("x-requests-remaining"))
+        except (TypeError, ValueError):
+            return
+        with self._lock:
+            self.remaining = remaining
+
+    def _can_retry(self, attempt):
+        if attempt >= self.max_retries:
+            return False
+        with self._lock:
+            if self.remaining is not None and self.remaining < self.quota_floor:
+                self.floor_blocks += 1
+                return False
+        return True
+
+    def call(self, endpoint, send, cancel=None):
+        # send() hace la petición y devuelve la respuesta; aquí se decide si repetirla.
+        # El circuito cuenta llamadas fallidas ya reintentadas, no cada intento suelto.
+        # cancel: threading.Event; marcado, no se hace ningún intento más (FetchCancelled)
+        if cancel is not None and cancel.is_set():
+            raise FetchCancelled()
+        breaker = self.breaker(endpoint)
+        if not breaker.allow():
+            with self._lock:
+                self.short_circuits += 1
+            raise CircuitOpenError(f"Circuito abierto para {endpoint}: la API está fallando")
+        attempt = 0
+        while True:
+            try:
+                response = send()
+            except RETRY_ERRORS:
+                if not self._can_retry(attempt):
+                    self._give_up(breaker)
+                    raise
+                delay = self.backoff(attempt)
+            except BaseException:
+                # Fallo que no es de la API (cuota agotada en el KeyPool, cuerpo cortado…): no cuenta
+                # para el circuito, pero la petición de prueba de un half_open debe quedar libre
+                breaker.release()
+                raise
+            else:
+                self._note_quota(response)
+                if response.status_code not in RETRY_STATUSES:
+                    breaker.record_success()
+                    return response
+                delay = retry_after_seconds(response)
+                if delay is None:
+                    delay = self.backoff(attempt)
+                # Si la API pide esperar más de lo razonable, mejor devolver el error ya
+                if delay > self.max_delay or not self._can_retry(attempt):
+                    self._give_up(breaker)
+                    return response
+                response.close()  # devuelve la conexión al pool antes de esperar
+            with self._lock:
+                self.retries += 1
+                self.wait_seconds += delay
+            if cancel is None:
+                self.sleep(delay)
+            elif cancel.wait(delay):
+                breaker.release()
+                raise FetchCancelled()
+            attempt += 1
+
+    def _give_up(self, breaker):
+        breaker.record_failure()
+        with self._lock:
+            self.giveups += 1
+
+    def stats(self):
+        with self._lock:
+            breakers = {k: b.state for k, b in self._breakers.items()}
+            return {
+                "retries": self.retries,
+                "wait_seconds": round(self.wait_seconds, 2),
+                "giveups": self.giveups,
+                "short_circuits": self.short_circuits,
+                "floor_blocks": self.floor_blocks,
+                "breakers": breakers,
+            }
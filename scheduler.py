@@ -0,0 +1,313 @@
+# scheduler.py
+# Planificador de refresco que reparte la cuota restante de The Odds API hasta su reinicio.
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timezone
+
+DEFAULT_COST = 1.0        # coste supuesto de una llamada hasta ver x-requests-last
+MIN_WEIGHT = 0.2          # un deporte sin arbitrajes nunca se queda sin refrescar del todo
+YIELD_ALPHA = 0.3         # suavizado (EWMA) de arbitrajes encontrados por consulta
+MAX_INTERVAL = 6 * 3600   # como mucho, una consulta cada 6 horas
+
+def next_month_reset(now=None):
+    now = now or datetime.now(timezone.utc)
+    if now.month == 12:
+        return datetime(now.year + 1, 1, 1, tzinfo=timezone.utc)
+    return datetime(now.year, now.month + 1, 1, tzinfo=timezone.utc)
+
+def _to_float(v):
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return None
+
+class QuotaScheduler:
+    def __init__(self, reset_at=None, max_interval=MAX_INTERVAL):
+        self.reset_at = reset_at
+        self.max_interval = max_interval
+        self.remaining = None
+        self.used = None
+        self._cost = {}        # sport_key -> último x-requests-last
+        self._yield = {}       # sport_key -> EWMA de arbitrajes por consulta
+        self._last_token = {}  # sport_key -> token de la última respuesta contabilizada
+        self._hot_cost = {}    # sport_key -> último x-requests-last de /events/{id}/odds
+        self.hot_calls = 0     # llamadas por evento descargadas (no servidas desde caché)
+        self.hot_credits = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, sport_key, headers, n_arbs, token=None):
+        # token identifica la respuesta (p. ej. el bucket de caché) para no contar dos veces un hit
+        with self._lock:
+            if token is not None:
+                if self._last_token.get(sport_key) == token:
+                    return
+                self._last_token[sport_key] = token
+            remaining = _to_float(headers.get("x-requests-remaining"))
+            if remaining is not None:
+                self.remaining = remaining
+            used = _to_float(headers.get("x-requests-used"))
+            if used is not None:
+                self.used = used
+            last = _to_float(headers.get("x-requests-last"))
+            if last is not None and last > 0:
+                self._cost[sport_key] = last
+            prev = self._yield.get(sport_key)
+            self._yield[sport_key] = n_arbs if prev is None else (1 - YIELD_ALPHA) * prev + YIELD_ALPHA * n_arbs
+
+    def observe_quota(self, headers):
+        # Solo el saldo (p. ej. llamadas por evento, cuyo coste no es el del deporte entero)
+        with self._lock:
+            remaining = _to_float(headers.get("x-requests-remaining"))
+            if remaining is not None:
+                self.remaining = remaining
+            used = _to_float(headers.get("x-requests-used"))
+            if used is not None:
+                self.used = used
+
+    def observe_hot(self, sport_key, headers):
+        # Llamada por evento: su coste sale de la parte del presupuesto reservada (hot_intervals)
+        self.observe_quota(headers)
+        last = _to_float(headers.get("x-requests-last"))
+        with self._lock:
+            if last is not None and last > 0:
+                self._hot_cost[sport_key] = last
+            self.hot_calls += 1
+            self.hot_credits += self._hot_cost.get(sport_key, self._cost.get(sport_key, DEFAULT_COST))
+
+    def hot_intervals(self, hot_counts, share, hot_interval, intervals, now=None):
+        # Gasto extra elegido por el usuario: la fracción share del presupuesto (que intervals()
+        # deja fuera con reserve=share) paga una llamada a /events/{id}/odds por evento caliente.
+        # Todos al mismo ritmo h, como mucho cada hot_interval: sum(n * coste_evento) / h = share *
+        # presupuesto. Un deporte cuya descarga completa llega antes que h no gana nada y sale del
+        # reparto. -> {sport_key: h}
+        with self._lock:
+            rate = self.budget_rate(now)
+            costs = {k: self._hot_cost.get(k, self._cost.get(k, DEFAULT_COST)) for k in hot_counts}
+        if not share or rate is None or rate <= 0:
+            return {}
+        hot = {k: n for k, n in hot_counts.items() if n and k in intervals}
+        while hot:
+            h = max(float(hot_interval), sum(n * costs[k] for k, n in hot.items()) / (rate * share))
+            slow = [k for k in hot if h >= intervals[k]]
+            if not slow:
+                return {k: h for k in hot}
+            for k in slow:
+                del hot[k]
+        return {}
+
+    def seconds_to_reset(self, now=None):
+        reset_at = self.reset_at or next_month_reset()
+        now = now or time.time()
+        return max(reset_at.timestamp() - now, 60.0)
+
+    def budget_rate(self, now=None):
+        # Créditos por segundo que podemos gastar para llegar justos al reinicio
+        if self.remaining is None:
+            return None
+        return max(self.remaining, 0.0) / self.seconds_to_reset(now)
+
+    def intervals(self, sport_keys, min_interval, now=None, floors=None, reserve=0.0):
+        # min_interval es el techo de frecuencia (slider TTL): nunca se consulta más rápido.
+        # floors: intervalo mínimo propio de cada deporte (p. ej. según commence_ttl)
+        # reserve: fracción del presupuesto que se gasta en otra cosa (eventos calientes)
+        sport_keys = list(dict.fromkeys(sport_keys))
+        floors = {k: max(float(min_interval), float((floors or {}).get(k, 0.0))) for k in sport_keys}
+        with self._lock:
+            rate = self.budget_rate(now)
+            if rate is not None:
+                rate *= 1 - reserve
+            costs = {k: self._cost.get(k, DEFAULT_COST) for k in sport_keys}
+            weights = {k: MIN_WEIGHT + self._yield.get(k, 1.0) for k in sport_keys}
+        if not sport_keys:
+            return {}
+        if rate is None:
+            return floors
+        if rate <= 0:
+            return {k: float(self.max_interval) for k in sport_keys}
+        # ¿Alcanza la cuota para refrescar todo al ritmo máximo?
+        if sum(costs[k] / floors[k] for k in sport_keys) <= rate:
+            return floors
+        # Cuota escasa: el presupuesto se reparte en proporción al rendimiento de cada deporte
+        total_w = sum(weights.values())
+        out = {}
+        for k in sport_keys:
+            share = rate * weights[k] / total_w
+            out[k] = min(max(costs[k] / share, floors[k]), max(floors[k], float(self.max_interval)))
+        return out
+
+    def snapshot(self, sport_keys, min_interval, now=None, floors=None):
+        iv = self.intervals(sport_keys, min_interval, now, floors)
+        with self._lock:
+            return [
+                {
+                    "sport_key": k,
+                    "interval_s": round(iv[k], 1),
+                    "ttl_partido_s": round(max(float(min_interval), (floors or {}).get(k, 0.0)), 1),
+                    "cost": self._cost.get(k, DEFAULT_COST),
+                    "yield": round(self._yield.get(k, 0.0), 2),
+                    "credits_per_day": round(86400 * self._cost.get(k, DEFAULT_COST) / iv[k], 1),
+                }
+                for k in iv
+            ]
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Descubrimiento de eventos (gratis) antes de gastar cuota en /odds
+# ──────────────────────────────────────────────────────────────────────────────
+EVENTS_TTL = 120  # /events no cuesta créditos: se puede consultar a menudo
+
+def parse_time(value):
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except (AttributeError, ValueError):
+        return None
+
+def format_time(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def commence_window(window_hours, now=None):
+    # commenceTimeTo para /odds, redondeado a la hora siguiente para que la petición (y sus
+    # grabaciones) no cambie a cada segundo; la caché va por window_hours (odds_cache.odds_key).
+    # Sin commenceTimeFrom: los partidos en juego también interesan
+    if not window_hours:
+        return None
+    limit = (now or time.time()) + window_hours * 3600
+    return format_time(math.ceil(limit / 3600) * 3600)
+
+def events_in_window(events, window_hours=None, now=None):
+    # Eventos que empiezan antes de now + window_hours (los ya empezados también cuentan)
+    if not window_hours:
+        return list(events)
+    limit = (now or time.time()) + window_hours * 3600
+    out = []
+    for ev in events:
+        ts = parse_time(ev.get("commence_time"))
+        if ts is None or ts <= limit:
+            out.append(ev)
+    return out
+
+def events_fingerprint(events):
+    h = hashlib.sha1()
+    for ev in sorted(events, key=lambda e: str(e.get("id"))):
+        h.update(f"{ev.get('id')}|{ev.get('commence_time')}\n".encode())
+    return h.hexdigest()
+
+# ──────────────────────────────────────────────────────────────────────────────
+# TTL según lo que falta para el partido más próximo
+# ──────────────────────────────────────────────────────────────────────────────
+TTL_LEAD_FRACTION = 1 / 24   # a 3 días del partido, cada 3 h; a 2 h, cada 5 min
+TTL_MAX = 3 * 3600           # ni los torneos lejanos pasan más de 3 h sin refrescar
+
+def next_start(events):
+    # commence_time más temprano (en el pasado si algún partido ya está en juego)
+    starts = [ts for ts in (parse_time(ev.get("commence_time")) for ev in events) if ts is not None]
+    return min(starts) if starts else None
+
+def commence_ttl(start, min_interval, now=None, fraction=TTL_LEAD_FRACTION, max_ttl=TTL_MAX):
+    # En juego o a punto de empezar -> min_interval; lejos -> proporcional a lo que falta
+    if start is None:
+        return float(min_interval)
+    lead = max(start - (now or time.time()), 0.0)
+    return min(max(lead * fraction, float(min_interval)), max(float(max_ttl), float(min_interval)))
+
+class EventGate:
+    # Recuerda qué lista de eventos había al descargar las cuotas de cada deporte
+    def __init__(self):
+        self._fingerprints = {}
+        self._lock = threading.Lock()
+        self.skipped = 0   # descargas de /odds ahorradas por no haber partidos
+        self.forced = 0    # descargas adelantadas porque apareció algo nuevo
+
+    def decide(self, sport_key, events):
+        # -> (fetch, force, fingerprint). Sin eventos no se descarga; con eventos nuevos se fuerza
+        if not events:
+            with self._lock:
+                self.skipped += 1
+            return False, False, None
+        fp = events_fingerprint(events)
+        with self._lock:
+            prev = self._fingerprints.get(sport_key)
+            force = prev is not None and prev != fp
+            if force:
+                self.forced += 1
+        return True, force, fp
+
+    def mark_fetched(self, sport_key, fingerprint):
+        if fingerprint is None:
+            return
+        with self._lock:
+            self._fingerprints[sport_key] = fingerprint
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Hot set: eventos que se refrescan uno a uno y más a menudo que su deporte
+# ──────────────────────────────────────────────────────────────────────────────
+HOT_SOON_SECONDS = 30 * 60   # empieza en menos de 30 minutos (o ya en juego)
+HOT_HOLD_SECONDS = 10 * 60   # sigue caliente 10 minutos después del último arbitraje visto
+HOT_MAX_EVENTS = 20          # tope de eventos calientes vigilados a la vez
+
+class HotSet:
+    def __init__(self, soon_seconds=HOT_SOON_SECONDS, hold_seconds=HOT_HOLD_SECONDS, max_events=HOT_MAX_EVENTS):
+        self.soon_seconds = soon_seconds
+        self.hold_seconds = hold_seconds
+        self.max_events = max_events
+        self._events = {}     # event_id -> {"sport_key", "commence", "arb_at", "polled_at"}
+        self._lock = threading.Lock()
+
+    def update_from_payload(self, sport_key, events, arb_event_ids, now=None):
+        # Tras cada descarga completa del deporte: altas, bajas y arbitrajes vistos
+        now = now or time.time()
+        seen = set()
+        with self._lock:
+            for ev in events:
+                event_id = ev.get("id")
+                seen.add(event_id)
+                commence = parse_time(ev.get("commence_time"))
+                entry = self._events.get(event_id)
+                if entry is None:
+                    entry = self._events[event_id] = {"sport_key": sport_key, "arb_at": None, "polled_at": 0.0}
+                entry["commence"] = commence
+                if event_id in arb_event_ids:
+                    entry["arb_at"] = now
+            for event_id in [e for e, v in self._events.items() if v["sport_key"] == sport_key and e not in seen]:
+                del self._events[event_id]
+
+    def mark_arb(self, event_id, has_arb, now=None):
+        with self._lock:
+            entry = self._events.get(event_id)
+            if entry is not None and has_arb:
+                entry["arb_at"] = now or time.time()
+
+    def _is_hot(self, entry, now):
+        if entry["arb_at"] is not None and now - entry["arb_at"] <= self.hold_seconds:
+            return True
+        return entry["commence"] is not None and entry["commence"] - now <= self.soon_seconds
+
+    def hot(self, now=None):
+        # [(sport_key, event_id)] priorizando arbitrajes recientes y luego los que empiezan antes
+        now = now or time.time()
+        with self._lock:
+            items = [(e, v) for e, v in self._events.items() if self._is_hot(v, now)]
+        items.sort(key=lambda kv: (kv[1]["arb_at"] is None, kv[1]["commence"] or float("inf")))
+        return [(v["sport_key"], e) for e, v in items[:self.max_events]]
+
+    def due(self, intervals, now=None):
+        # intervals: sport_key -> segundos entre llamadas por evento; los demás deportes no se tocan
+        now = now or time.time()
+        out = []
+        for sport_key, event_id in self.hot(now):
+            if sport_key not in intervals:
+                continue
+            with self._lock:
+                entry = self._events.get(event_id)
+                if entry is not None and now - entry["polled_at"] >= intervals[sport_key]:
+                    entry["polled_at"] = now
+                    out.append((sport_key, event_id))
+        return out
+
+    def counts(self, now=None):
+        # sport_key -> número de eventos calientes
+        out = {}
+        for sport_key, _ in self.hot(now):
+            out[sport_key] = out.get(sport_key, 0) + 1
+        return out
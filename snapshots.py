@@ -0,0 +1,51 @@
+# snapshots.py
+# Snapshots versionados de arbitrajes que publica poller.py y lee app.py.
+import json
+import threading
+import time
+
+import odds_cache
+
+DEFAULT_KEEP = 50  # versiones que se conservan
+
+class SnapshotStore:
+    def __init__(self, path=odds_cache.DEFAULT_DB_PATH, keep=DEFAULT_KEEP):
+        self.path = path
+        self.keep = keep
+        self._local = threading.local()
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS snapshots ("
+            " version INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " created_at REAL NOT NULL,"
+            " body TEXT NOT NULL)"
+        )
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = odds_cache.connect(self.path)
+        return conn
+
+    def publish(self, body, created_at=None):
+        created_at = time.time() if created_at is None else created_at
+        conn = self._conn()
+        cur = conn.execute(
+            "INSERT INTO snapshots (created_at, body) VALUES (?, ?)",
+            (created_at, json.dumps(body, separators=(",", ":"))),
+        )
+        version = cur.lastrowid
+        conn.execute("DELETE FROM snapshots WHERE version <= ?", (version - self.keep,))
+        return version
+
+    def latest_version(self):
+        row = self._conn().execute("SELECT MAX(version) FROM snapshots").fetchone()
+        return row[0]
+
+    def latest(self):
+        # (version, created_at, body) o None si el poller aún no ha publicado nada
+        row = self._conn().execute(
+            "SELECT version, created_at, body FROM snapshots ORDER BY version DESC LIMIT 1"
+        ).fetchone()
+        if row is None:
+            return None
+        return row[0], row[1], json.loads(row[2])
@@ -0,0 +1,66 @@
+# tests/test_arbs.py
+import arbs
+
+def event(event_id, prices, stamp):
+    # prices: {casa: (cuota P1, cuota P2)}
+    return {
+        "id": event_id, "commence_time": "2026-01-01T12:00:00Z", "home_team": "P1", "away_team": "P2",
+        "bookmakers": [
+            {"key": book, "title": book.title(), "last_update": stamp,
+             "markets": [{"key": "h2h", "outcomes": [{"name": "P1", "price": p1}, {"name": "P2", "price": p2}]}]}
+            for book, (p1, p2) in prices.items()
+        ],
+    }
+
+ARB = {"alpha": (2.2, 1.6), "beta": (1.6, 2.2)}      # P1 en alpha y P2 en beta: 1/2.2 + 1/2.2 < 1
+ARB_WIDER = {"alpha": (2.4, 1.6), "beta": (1.6, 2.2)}
+NO_ARB = {"alpha": (1.8, 1.9), "beta": (1.85, 1.85)}
+
+def counts(changes):
+    return {k: len(v) for k, v in changes.items()}
+
+def test_first_update_reports_added():
+    tracker = arbs.IncrementalArbs("ATP")
+    events, changes = tracker.update([event("e1", ARB, "t1"), event("e2", NO_ARB, "t1")])
+    assert [ev["event_id"] for ev in events] == ["e1"]
+    assert counts(changes) == {"added": 1, "removed": 0, "changed": 0}
+    assert changes["added"][0]["event_id"] == "e1"
+
+def test_unchanged_last_update_is_skipped():
+    tracker = arbs.IncrementalArbs("ATP")
+    tracker.update([event("e1", ARB, "t1")])
+    events, changes = tracker.update([event("e1", ARB, "t1")])
+    assert len(events) == 1
+    assert counts(changes) == {"added": 0, "removed": 0, "changed": 0}
+    assert tracker.stats() == {"events": 1, "evaluated": 1, "skipped": 1}
+
+def test_new_prices_report_changed_with_previous():
+    tracker = arbs.IncrementalArbs("ATP")
+    tracker.update([event("e1", ARB, "t1")])
+    _, changes = tracker.update([event("e1", ARB_WIDER, "t2")])
+    assert counts(changes) == {"added": 0, "removed": 0, "changed": 1}
+    change = changes["changed"][0]
+    assert change["arb"]["edge"] > change["previous"]["edge"]
+
+def test_closed_arb_and_dropped_event_report_removed():
+    tracker = arbs.IncrementalArbs("ATP")
+    tracker.update([event("e1", ARB, "t1"), event("e2", ARB, "t1")])
+    events, changes = tracker.update([event("e1", NO_ARB, "t2")])  # e2 ya no viene en el deporte
+    assert events == []
+    assert sorted(c["event_id"] for c in changes["removed"]) == ["e1", "e2"]
+    assert tracker.stats()["events"] == 1
+
+def test_partial_update_keeps_other_events():
+    tracker = arbs.IncrementalArbs("ATP")
+    tracker.update([event("e1", ARB, "t1"), event("e2", ARB, "t1")])
+    events, changes = tracker.update([event("e2", ARB_WIDER, "t2")], complete=False)
+    assert [ev["event_id"] for ev in events] == ["e1", "e2"]
+    assert counts(changes) == {"added": 0, "removed": 0, "changed": 1}
+    events, changes = tracker.remove("e1")
+    assert [ev["event_id"] for ev in events] == ["e2"]
+    assert [c["event_id"] for c in changes["removed"]] == ["e1"]
+
+def test_matches_full_detection():
+    data = [event("e1", ARB, "t1"), event("e2", NO_ARB, "t1"), event("e3", ARB_WIDER, "t1")]
+    events, _ = arbs.IncrementalArbs("ATP").update(data)
+    assert events == arbs.event_arbs(data, "ATP")
@@ -0,0 +1,77 @@
+# tests/test_keypool.py
+import io
+from datetime import datetime, timezone
+
+import pytest
+import requests
+
+import keypool
+
+def response(status=200, remaining=None, last=1):
+    r = requests.Response()
+    r.status_code = status
+    if remaining is not None:
+        r.headers.update({"x-requests-remaining": str(remaining), "x-requests-last": str(last)})
+    r.raw = io.BytesIO(b"{}")
+    return r
+
+def test_keys_without_quota_data_take_turns():
+    pool = keypool.KeyPool(["a", "b", "c"])
+    picked = []
+    for _ in range(6):
+        key = pool.acquire()
+        pool.release(key)
+        picked.append(key)
+    assert sorted(picked) == ["a", "a", "b", "b", "c", "c"]
+
+def test_prefers_key_with_most_remaining():
+    pool = keypool.KeyPool(["a", "b"])
+    for key, remaining in (("a", 10), ("b", 400)):
+        pool.release(pool.acquire(exclude=[k for k in "ab" if k != key]), response(remaining=remaining))
+    sent = []
+    pool.call(lambda key: sent.append(key) or response(remaining=399))
+    assert sent == ["b"]
+
+def test_in_flight_calls_count_against_remaining():
+    pool = keypool.KeyPool(["a", "b"])
+    pool.release(pool.acquire(exclude=["b"]), response(remaining=100, last=30))
+    pool.release(pool.acquire(exclude=["a"]), response(remaining=80, last=30))
+    assert pool.acquire() == "a"   # 100 frente a 80
+    assert pool.acquire() == "b"   # 100 - 30 en vuelo frente a 80
+    assert pool.acquire() == "a"   # 70 frente a 80 - 30
+
+def test_401_moves_on_to_next_key_and_benches_the_first():
+    pool = keypool.KeyPool(["a", "b"])
+    sent = []
+
+    def send(key):
+        sent.append(key)
+        return response(401 if key == sent[0] else 200, remaining=50)
+    r = pool.call(send)
+    assert r.status_code == 200
+    assert len(sent) == 2 and sent[0] != sent[1]
+    assert [s["exhausted"] for s in pool.stats() if s["key"] == f"…{sent[0]}"] == [True]
+    pool.call(lambda key: sent.append(key) or response(200))
+    assert sent[-1] == sent[1]
+
+def test_all_keys_401_returns_last_response_then_raises():
+    pool = keypool.KeyPool(["a", "b"])
+    assert pool.call(lambda key: response(401)).status_code == 401
+    with pytest.raises(keypool.QuotaExhaustedError):
+        pool.call(lambda key: response(200))
+
+def test_exhausted_key_revives_after_reset():
+    clock = [0.0]
+    reset_at = datetime.fromtimestamp(100, timezone.utc)
+    pool = keypool.KeyPool(["a"], reset_at=reset_at, clock=lambda: clock[0])
+    pool.call(lambda key: response(200, remaining=0))
+    with pytest.raises(keypool.QuotaExhaustedError):
+        pool.acquire()
+    clock[0] = 100.0
+    assert pool.acquire() == "a"
+
+def test_quota_sums_live_keys():
+    pool = keypool.KeyPool(["a", "b", "c"])
+    for key, remaining in (("a", 10), ("b", 0), ("c", 5)):
+        pool.release(pool.acquire(exclude=[k for k in "abc" if k != key]), response(remaining=remaining))
+    assert float(pool.quota()["x-requests-remaining"]) == 15.0
@@ -0,0 +1,92 @@
+# tests/test_odds_cache.py
+import threading
+import time
+
+import pytest
+import requests
+
+import odds_cache
+import resilience
+
+KEY = ("odds", "tennis_atp")
+
+def wait_for(cond, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not cond():
+        assert time.monotonic() < deadline, "timeout"
+        time.sleep(0.005)
+
+def run_in_thread(fn):
+    out = {}
+
+    def target():
+        try:
+            out["value"] = fn()
+        except BaseException as e:
+            out["error"] = e
+    t = threading.Thread(target=target)
+    t.start()
+    return t, out
+
+def leader_and_follower(cache, leader_fetch, follower_fetch, **kwargs):
+    # El líder se queda dentro de fetch hasta que el seguidor está esperando su resultado
+    release = threading.Event()
+
+    def blocked():
+        release.wait(5)
+        return leader_fetch()
+    leader, leader_out = run_in_thread(lambda: cache.get_or_fetch(KEY, 60, blocked, **kwargs))
+    wait_for(lambda: cache.is_refreshing(KEY))
+    follower, follower_out = run_in_thread(lambda: cache.get_or_fetch(KEY, 60, follower_fetch, **kwargs))
+    wait_for(lambda: cache.coalesced == 1)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+    return leader_out, follower_out
+
+def test_followers_share_leader_result():
+    cache = odds_cache.TTLCache()
+    calls = []
+    leader_out, follower_out = leader_and_follower(
+        cache, lambda: calls.append("leader") or "odds", lambda: calls.append("follower") or "other")
+    assert calls == ["leader"]
+    assert leader_out["value"][0] == follower_out["value"][0] == "odds"
+
+def test_followers_get_leader_error():
+    cache = odds_cache.TTLCache()
+
+    def fail():
+        raise ValueError("cuerpo inválido")
+    leader_out, follower_out = leader_and_follower(cache, fail, lambda: "other")
+    assert isinstance(leader_out["error"], ValueError)
+    assert follower_out["error"] is leader_out["error"]
+    assert not cache.is_refreshing(KEY)
+
+def test_followers_fall_back_to_stored_copy_on_leader_network_error():
+    clock = [0.0]
+    cache = odds_cache.TTLCache(clock=lambda: clock[0])
+    cache.put(KEY, "old")
+    clock[0] = 120.0  # caducada para ttl=60
+
+    def offline():
+        raise requests.ConnectionError()
+    leader_out, follower_out = leader_and_follower(cache, offline, lambda: "other",
+                                                   offline_errors=(requests.ConnectionError,))
+    assert leader_out["value"] == follower_out["value"] == ("old", 0.0)
+    assert cache.offline_served == 2
+
+def test_follower_fetches_itself_when_leader_cancelled():
+    cache = odds_cache.TTLCache()
+
+    def cancelled():
+        raise resilience.FetchCancelled()
+    leader_out, follower_out = leader_and_follower(cache, cancelled, lambda: "follower")
+    assert isinstance(leader_out["error"], resilience.FetchCancelled)
+    assert follower_out["value"][0] == "follower"
+    assert cache.get(KEY, 60)[0] == "follower"
+
+def test_leader_error_is_not_cached():
+    cache = odds_cache.TTLCache()
+    with pytest.raises(ValueError):
+        cache.get_or_fetch(KEY, 60, lambda: (_ for _ in ()).throw(ValueError()))
+    assert cache.get_or_fetch(KEY, 60, lambda: "odds")[0] == "odds"
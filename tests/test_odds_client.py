@@ -0,0 +1,42 @@
+# tests/test_odds_client.py
+import json
+
+import pytest
+
+import odds_client
+
+EVENTS = [
+    {"id": "e1", "home_team": "Nadal", "bookmakers": [{"key": "pinnacle", "price": 1.95}]},
+    {"id": "e2", "home_team": "Świątek", "note": "] , [ \" {"},
+    {"id": "e3", "home_team": "Djoković", "nested": {"a": [1, 2, {"b": "}"}]}},
+]
+
+def chunked(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 10**6])
+def test_items_survive_any_chunk_boundary(size):
+    # Tamaño 1 corta dentro de cadenas, números y caracteres UTF-8 de varios bytes
+    payload = json.dumps(EVENTS, ensure_ascii=False, indent=1).encode("utf-8")
+    assert list(odds_client.iter_json_array(chunked(payload, size))) == EVENTS
+
+def test_split_number_is_not_read_early():
+    # "12" partido en "1" + "2" no debe dar el elemento 1
+    assert list(odds_client.iter_json_array([b"[1", b"2, 3]"])) == [12, 3]
+
+def test_empty_array_and_whitespace():
+    assert list(odds_client.iter_json_array([b"  \n", b"[", b" ", b"]"])) == []
+
+def test_items_yielded_before_array_ends():
+    items = odds_client.iter_json_array(iter([b'[{"id": "e1"},', b'{"id"']))
+    assert next(items) == {"id": "e1"}
+    with pytest.raises(ValueError):
+        next(items)
+
+def test_not_an_array():
+    with pytest.raises(ValueError):
+        list(odds_client.iter_json_array([b'{"message": "Invalid key"}']))
+
+def test_truncated_body():
+    with pytest.raises(ValueError):
+        list(odds_client.iter_json_array([b'[{"id": "e1"}, {"id": "e2"']))
@@ -0,0 +1,90 @@
+# tests/test_resilience.py
+import io
+
+import pytest
+import requests
+
+import keypool
+import resilience
+
+def response(status=200, headers=None):
+    r = requests.Response()
+    r.status_code = status
+    r.headers.update(headers or {})
+    r.raw = io.BytesIO(b"{}")
+    return r
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def half_open_policy(clock):
+    policy = resilience.Resilience(max_retries=0, failure_threshold=1, reset_timeout=10, sleep=lambda s: None)
+    policy._breakers["odds"] = resilience.CircuitBreaker(1, 10, clock=clock)
+    with pytest.raises(requests.ConnectionError):
+        policy.call("odds", lambda: (_ for _ in ()).throw(requests.ConnectionError()))
+    clock.now = 11.0  # pasado reset_timeout: la siguiente llamada es la de prueba
+    return policy
+
+def test_trial_released_when_send_raises_unexpected_error():
+    clock = Clock()
+    policy = half_open_policy(clock)
+
+    def exhausted():
+        raise keypool.QuotaExhaustedError("sin cuota")
+    with pytest.raises(keypool.QuotaExhaustedError):
+        policy.call("odds", exhausted)
+    assert policy.call("odds", lambda: response(200)).status_code == 200
+    assert policy.breaker("odds").state == "closed"
+
+def test_breaker_opens_after_threshold_and_short_circuits():
+    clock = Clock()
+    breaker = resilience.CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+def test_breaker_half_open_allows_single_trial():
+    clock = Clock()
+    breaker = resilience.CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    clock.now = 10.0
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    assert not breaker.allow()  # la prueba sigue en vuelo
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.failures == 0
+    assert breaker.allow() and breaker.allow()
+
+def test_breaker_half_open_failure_reopens():
+    clock = Clock()
+    breaker = resilience.CircuitBreaker(failure_threshold=3, reset_timeout=10, clock=clock)
+    for _ in range(3):
+        breaker.record_failure()
+    clock.now = 10.0
+    assert breaker.allow()
+    breaker.record_failure()  # un solo fallo en half_open basta
+    assert breaker.state == "open" and breaker.opened_at == 10.0
+    assert not breaker.allow()
+    clock.now = 20.0
+    assert breaker.allow()
+
+def test_policy_short_circuits_while_open():
+    clock = Clock()
+    policy = half_open_policy(clock)
+    clock.now = 5.0  # aún dentro de reset_timeout
+    with pytest.raises(resilience.CircuitOpenError):
+        policy.call("odds", lambda: response(200))
+    assert policy.stats()["short_circuits"] == 1
+
+def test_retry_status_failure_counts_once_for_the_breaker():
+    # Los reintentos de una misma llamada no abren el circuito por separado
+    policy = resilience.Resilience(max_retries=2, failure_threshold=2, sleep=lambda s: None)
+    assert policy.call("odds", lambda: response(503)).status_code == 503
+    assert policy.retries == 2
+    assert policy.breaker("odds").state == "closed" and policy.breaker("odds").failures == 1
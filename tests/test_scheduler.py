@@ -0,0 +1,34 @@
+# tests/test_scheduler.py
+from datetime import datetime, timezone
+
+import scheduler
+
+NOW = datetime(2026, 1, 1, tzinfo=timezone.utc).timestamp()
+
+def quota_scheduler(remaining, seconds=100000.0, cost=2.0, keys=("atp", "wta")):
+    # remaining créditos para `seconds` segundos: presupuesto de remaining / seconds por segundo
+    sched = scheduler.QuotaScheduler(reset_at=datetime.fromtimestamp(NOW + seconds, timezone.utc))
+    for k in keys:
+        sched.observe(k, {"x-requests-remaining": remaining, "x-requests-last": cost}, 0)
+    return sched
+
+def test_hot_intervals_disabled_without_share():
+    sched = quota_scheduler(10**6)
+    assert sched.hot_intervals({"atp": 1}, 0.0, 15, {"atp": 600.0}, now=NOW) == {}
+
+def test_hot_intervals_split_reserve_between_all_hot_events():
+    # 1 crédito/s, 20 % reservado: 3 eventos de 2 créditos -> uno cada 30 s
+    sched = quota_scheduler(100000)
+    plan = sched.hot_intervals({"atp": 1, "wta": 2}, 0.2, 15, {"atp": 600.0, "wta": 600.0}, now=NOW)
+    assert plan == {"atp": 30.0, "wta": 30.0}
+
+def test_hot_intervals_skip_sports_refreshed_faster_in_full():
+    # atp entero cada 20 s no gana nada con sus eventos: la reserva queda para wta
+    sched = quota_scheduler(100000)
+    plan = sched.hot_intervals({"atp": 1, "wta": 2}, 0.2, 15, {"atp": 20.0, "wta": 600.0}, now=NOW)
+    assert plan == {"wta": 20.0}
+
+def test_intervals_leave_reserve_out_of_full_refreshes():
+    sched = quota_scheduler(100000, keys=("atp",))
+    assert sched.intervals(["atp"], 1, now=NOW)["atp"] == 2.0
+    assert sched.intervals(["atp"], 1, now=NOW, reserve=0.5)["atp"] == 4.0